@@ -1,6 +1,13 @@
 import os
 
 import reflex as rx
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from app import media, uploads
+from app.backend import backend_lifespan, backend_stats
+from app.offload import loop_stats, offload_lifespan
 
 # Import pages so @rx.page routes are registered
 import app.pages.index      
@@ -14,6 +21,33 @@ import app.pages.bike_analyser
 import app.pages.sheds
 import app.pages.shed
 
+
+
+async def serve_stats(request):
+    """Process counters: backend GET cache hits / revalidations / coalescing,
+    and event-loop lag / stalls."""
+    return JSONResponse(
+        {"backend": backend_stats(), "event_loop": loop_stats()},
+        headers={"Cache-Control": "no-store"},
+    )
+
+
+# Extra HTTP routes served by the Reflex backend
+# (spooled upload previews, hero thumbnails, /_stats).
+api = Starlette(routes=[
+    *uploads.routes,
+    *media.routes,
+    Route("/_stats", serve_stats, methods=["GET"]),
+])
+
 app = rx.App(
     stylesheets=["/theme.css"],      # served from assets/theme.css
-)
\ No newline at end of file
+    api_transformer=api,
+)
+
+# Shared pooled backend client lives for the whole server process.
+app.register_lifespan_task(backend_lifespan)
+# Offload pool for CPU-heavy work + event-loop lag monitor.
+app.register_lifespan_task(offload_lifespan)
+# Evicts expired spooled uploads.
+app.register_lifespan_task(uploads.uploads_lifespan)
@@ -0,0 +1,354 @@
+# app/backend.py
+"""Shared HTTP client for talking to the FastAPI backend.
+
+One pooled httpx.AsyncClient per process, so every state handler reuses
+keep-alive connections instead of paying a fresh TCP/TLS handshake per call.
+
+Tunable via env:
+  BACKEND_ORIGIN               base URL of the backend
+  BACKEND_MAX_CONNECTIONS      total pool size
+  BACKEND_MAX_KEEPALIVE        idle connections kept open
+  BACKEND_KEEPALIVE_EXPIRY     seconds an idle connection is kept
+  BACKEND_CONNECT_TIMEOUT      connect / pool-acquire timeout (s)
+  BACKEND_TIMEOUT              default read / write timeout (s)
+  BACKEND_RESPONSE_CACHE_MAX   entries kept by the conditional-GET cache
+  BACKEND_UPLOAD_CHUNK         bytes per chunk when streaming file uploads
+  BACKEND_STREAM_IDLE_TIMEOUT  max silence (s) on a streaming response
+"""
+import asyncio
+import contextlib
+import dataclasses
+import hashlib
+import json
+import os
+import secrets
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+import httpx
+
+from app.offload import run_offloaded
+
+BACKEND_ORIGIN = os.getenv("BACKEND_ORIGIN", "http://127.0.0.1:9000")
+
+MAX_CONNECTIONS = int(os.getenv("BACKEND_MAX_CONNECTIONS", "100"))
+MAX_KEEPALIVE = int(os.getenv("BACKEND_MAX_KEEPALIVE", "20"))
+KEEPALIVE_EXPIRY = float(os.getenv("BACKEND_KEEPALIVE_EXPIRY", "30"))
+CONNECT_TIMEOUT = float(os.getenv("BACKEND_CONNECT_TIMEOUT", "10"))
+DEFAULT_TIMEOUT = float(os.getenv("BACKEND_TIMEOUT", "20"))
+RESPONSE_CACHE_MAX = int(os.getenv("BACKEND_RESPONSE_CACHE_MAX", "512"))
+UPLOAD_CHUNK = int(os.getenv("BACKEND_UPLOAD_CHUNK", str(256 * 1024)))
+STREAM_IDLE_TIMEOUT = float(os.getenv("BACKEND_STREAM_IDLE_TIMEOUT", "60"))
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _build_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        base_url=BACKEND_ORIGIN,
+        follow_redirects=True,
+        limits=httpx.Limits(
+            max_connections=MAX_CONNECTIONS,
+            max_keepalive_connections=MAX_KEEPALIVE,
+            keepalive_expiry=KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(DEFAULT_TIMEOUT, connect=CONNECT_TIMEOUT, pool=CONNECT_TIMEOUT),
+    )
+
+
+def get_client() -> httpx.AsyncClient:
+    """Return the process-wide backend client (created lazily).
+
+    Do NOT use it as `async with get_client()` – that would close the pool.
+    Pass a per-request `timeout=` where a call needs something other than
+    the default.
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+    return _client
+
+
+async def close_client():
+    """Close the shared client and drop its pooled connections."""
+    global _client
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client = None
+
+
+@contextlib.asynccontextmanager
+async def backend_lifespan():
+    """Reflex lifespan task: open the pool on startup, close it on shutdown."""
+    get_client()
+    try:
+        yield
+    finally:
+        await close_client()
+
+
+async def post_file(
+    path: str,
+    token: str,
+    *,
+    file_path: str,
+    filename: str,
+    content_type: str,
+    field: str = "file",
+    on_progress: Optional[Callable[[int, int], Any]] = None,
+    timeout: Optional[float] = None,
+) -> httpx.Response:
+    """Stream a file from disk to the backend as multipart/form-data.
+
+    The body is produced chunk by chunk (UPLOAD_CHUNK bytes, disk reads in
+    the offload pool), so memory stays flat regardless of file size.
+    `await on_progress(bytes_sent, total_bytes)` is called roughly every 2%
+    and once at the end. `timeout` applies per read/write, not in total.
+    """
+    boundary = secrets.token_hex(16)
+    safe_name = filename.replace("\r", "").replace("\n", "").replace('"', "%22")
+    head = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="{field}"; filename="{safe_name}"\r\n'
+        f"Content-Type: {content_type}\r\n\r\n"
+    ).encode("utf-8")
+    tail = f"\r\n--{boundary}--\r\n".encode("utf-8")
+    size = os.path.getsize(file_path)
+
+    async def body():
+        yield head
+        sent = reported = 0
+        step = max(size // 50, UPLOAD_CHUNK)
+        with open(file_path, "rb") as fh:
+            while True:
+                chunk = await run_offloaded(fh.read, UPLOAD_CHUNK)
+                if not chunk:
+                    break
+                yield chunk
+                sent += len(chunk)
+                if on_progress is not None and (sent - reported >= step or sent == size):
+                    reported = sent
+                    await on_progress(sent, size)
+        yield tail
+
+    headers = {
+        "Authorization": f"Bearer {token}",
+        "Content-Type": f"multipart/form-data; boundary={boundary}",
+        "Content-Length": str(len(head) + size + len(tail)),
+    }
+    kwargs = {"content": body(), "headers": headers}
+    if timeout is not None:
+        kwargs["timeout"] = timeout
+    return await get_client().post(path, **kwargs)
+
+
+async def iter_ndjson(
+    path: str,
+    token: str,
+    *,
+    params: Optional[dict] = None,
+    idle_timeout: float = STREAM_IDLE_TIMEOUT,
+):
+    """GET a streaming endpoint and yield one parsed object per NDJSON line.
+
+    There is no overall deadline: the read timeout applies between chunks,
+    so a long response is fine as long as data keeps arriving. A plain
+    application/json body is yielded as a single object. Non-2xx responses
+    raise httpx.HTTPStatusError (body already read).
+    """
+    headers = {
+        "Authorization": f"Bearer {token}",
+        "Accept": "application/x-ndjson, application/json;q=0.5",
+    }
+    timeout = httpx.Timeout(
+        DEFAULT_TIMEOUT, connect=CONNECT_TIMEOUT, pool=CONNECT_TIMEOUT, read=idle_timeout
+    )
+    async with get_client().stream("GET", path, params=params, headers=headers, timeout=timeout) as r:
+        if not (200 <= r.status_code < 300):
+            await r.aread()
+            r.raise_for_status()
+        if "ndjson" not in r.headers.get("content-type", ""):
+            yield json.loads(await r.aread())
+            return
+        async for line in r.aiter_lines():
+            if line.strip():
+                yield json.loads(line)
+
+
+# ---------- conditional-GET response cache ----------
+
+@dataclasses.dataclass
+class CachedResponse:
+    etag: Optional[str]
+    last_modified: Optional[str]
+    data: Any            # body AFTER postprocess – treat as read-only
+
+
+_response_cache: "OrderedDict[tuple, CachedResponse]" = OrderedDict()
+
+# Single-flight: identical GETs (same user, URL, postprocess) that overlap
+# share one backend request and its parsed result.
+_inflight: dict[tuple, asyncio.Task] = {}
+
+# Bumped per user by invalidate_cached; a GET that started under an older
+# generation must not write its (pre-write) body back into the cache.
+_generations: dict[str, int] = {}
+
+# Counters for the cache / coalescing layers (see backend_stats()).
+stats = {
+    "requests": 0,        # GETs actually sent to the backend
+    "not_modified": 0,    # ... of which answered 304 from the cache
+    "coalesced": 0,       # GETs that piggybacked on an in-flight request
+}
+
+
+def backend_stats() -> dict:
+    """Snapshot of the counters; `coalesced` is the number of requests saved."""
+    return dict(stats)
+
+
+def user_key(token: str) -> str:
+    # Don't keep raw tokens as long-lived dict keys.
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()[:32]
+
+
+def _cache_key(token: str, path: str, params: Optional[dict], postprocess: Optional[Callable]) -> tuple:
+    return (
+        user_key(token),
+        path,
+        tuple(sorted((params or {}).items())),
+        getattr(postprocess, "__qualname__", None),
+    )
+
+
+def _copy(data: Any) -> Any:
+    # Shallow copy so callers can reassign/extend without touching the cache.
+    if isinstance(data, list):
+        return list(data)
+    if isinstance(data, dict):
+        return dict(data)
+    return data
+
+
+async def get_json(
+    path: str,
+    token: str,
+    *,
+    params: Optional[dict] = None,
+    postprocess: Optional[Callable[[Any], Any]] = None,
+    timeout: Optional[float] = None,
+) -> tuple[int, Any]:
+    """Authenticated GET with ETag / Last-Modified revalidation.
+
+    Returns (status_code, data). On 2xx `data` is the parsed JSON run through
+    `postprocess`; on a 304 the stored post-processed body is returned with
+    status 200, so callers never redo the parse/patch work. On errors `data`
+    is the parsed error body (or None). Network errors raise httpx.HTTPError.
+
+    Concurrent identical calls are coalesced into one backend request.
+    """
+    key = _cache_key(token, path, params, postprocess)
+    task = _inflight.get(key)
+    if task is not None:
+        stats["coalesced"] += 1
+    else:
+        task = asyncio.ensure_future(_fetch_json(key, path, token, params, postprocess, timeout))
+        _inflight[key] = task
+        task.add_done_callback(lambda t: _finish_inflight(key, t))
+
+    # shield: one caller being cancelled must not cancel the shared request
+    status, data = await asyncio.shield(task)
+    return status, _copy(data)
+
+
+def _finish_inflight(key: tuple, task: asyncio.Task):
+    if _inflight.get(key) is task:
+        del _inflight[key]
+    if not task.cancelled():
+        task.exception()  # mark retrieved; waiters re-raise it themselves
+
+
+async def _fetch_json(
+    key: tuple,
+    path: str,
+    token: str,
+    params: Optional[dict],
+    postprocess: Optional[Callable[[Any], Any]],
+    timeout: Optional[float],
+) -> tuple[int, Any]:
+    generation = _generations.get(key[0], 0)
+    entry = _response_cache.get(key)
+
+    headers = {"Authorization": f"Bearer {token}"}
+    if entry is not None:
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+
+    kwargs = {"params": params, "headers": headers}
+    if timeout is not None:
+        kwargs["timeout"] = timeout
+    stats["requests"] += 1
+    r = await get_client().get(path, **kwargs)
+
+    if r.status_code == 304 and entry is not None:
+        stats["not_modified"] += 1
+        _response_cache.move_to_end(key)
+        return 200, entry.data
+
+    try:
+        data = r.json()
+    except Exception:
+        data = None
+
+    if not (200 <= r.status_code < 300):
+        _response_cache.pop(key, None)
+        return r.status_code, data
+
+    if postprocess is not None:
+        data = postprocess(data)
+
+    if _generations.get(key[0], 0) != generation:
+        return r.status_code, data   # invalidated while in flight; don't cache
+
+    # Stored even without validators: peek_json serves it as the stale copy.
+    _response_cache[key] = CachedResponse(
+        r.headers.get("etag"), r.headers.get("last-modified"), data
+    )
+    _response_cache.move_to_end(key)
+    while len(_response_cache) > RESPONSE_CACHE_MAX:
+        _response_cache.popitem(last=False)
+    return r.status_code, data
+
+
+def peek_json(
+    path: str,
+    token: str,
+    *,
+    params: Optional[dict] = None,
+    postprocess: Optional[Callable[[Any], Any]] = None,
+) -> Any:
+    """Last good body get_json stored for this request, without any I/O.
+
+    Used for stale-while-revalidate: render this at once, then call get_json.
+    Returns None if nothing is cached (or it was invalidated).
+    """
+    entry = _response_cache.get(_cache_key(token, path, params, postprocess))
+    return None if entry is None else _copy(entry.data)
+
+
+def invalidate_cached(token: Optional[str], path: Optional[str] = None):
+    """Drop cached responses for this user (optionally only for one path).
+
+    In-flight GETs for them are detached too, so a read issued after a
+    write starts a fresh request instead of joining one from before it.
+    """
+    if not token:
+        return
+    user = user_key(token)
+    _generations[user] = _generations.get(user, 0) + 1
+    for key in [k for k in _response_cache if k[0] == user and (path is None or k[1] == path)]:
+        del _response_cache[key]
+    for key in [k for k in _inflight if k[0] == user and (path is None or k[1] == path)]:
+        del _inflight[key]
@@ -0,0 +1,86 @@
+import reflex as rx
+
+from app.state.compare_state import CompareState
+
+
+def compare_toggle(bike: dict) -> rx.Component:
+    """Small button for a bike card: add to / remove from the comparison."""
+    return rx.icon_button(
+        rx.cond(
+            CompareState.compared_ids.contains(bike["id"]),
+            rx.icon("chart-no-axes-combined"),
+            rx.icon("chart-line"),
+        ),
+        size="1",
+        variant=rx.cond(CompareState.compared_ids.contains(bike["id"]), "solid", "soft"),
+        title="Compare kinematics",
+        on_click=CompareState.toggle_compare(bike["id"], bike.get("name", "")).stop_propagation,
+    )
+
+
+def _legend_row(row: dict) -> rx.Component:
+    return rx.hstack(
+        rx.box(width="0.75rem", height="0.75rem", border_radius="50%", bg=row["color"]),
+        rx.text(row["name"], size="2"),
+        rx.text(row["status"], size="1", color="gray"),
+        rx.spacer(),
+        rx.icon_button(
+            "x",
+            size="1",
+            variant="ghost",
+            on_click=CompareState.toggle_compare(row["id"], row["name"]),
+        ),
+        align="center",
+        width="100%",
+    )
+
+
+def _chart() -> rx.Component:
+    return rx.recharts.line_chart(
+        rx.foreach(
+            CompareState.compare_series,
+            lambda b: rx.recharts.line(
+                data_key=b["id"],
+                name=b["name"],
+                stroke=b["color"],
+                dot=False,
+                type_="monotone",
+                is_animation_active=False,
+                connect_nulls=False,
+            ),
+        ),
+        rx.recharts.x_axis(data_key="travel", unit=" mm", type_="number"),
+        rx.recharts.y_axis(domain=["auto", "auto"]),
+        rx.recharts.graphing_tooltip(),
+        rx.recharts.legend(),
+        data=CompareState.compare_chart,
+        width="100%",
+        height=300,
+    )
+
+
+def compare_panel() -> rx.Component:
+    """Leverage ratio vs rear travel for the bikes picked with compare_toggle."""
+    return rx.cond(
+        CompareState.compare_bikes != [],
+        rx.vstack(
+            rx.hstack(
+                rx.heading("Compare kinematics", size="4"),
+                rx.spacer(),
+                rx.button("Clear", size="1", variant="soft", on_click=CompareState.clear_compare),
+                align="center",
+                width="100%",
+            ),
+            rx.foreach(CompareState.compare_rows, _legend_row),
+            rx.cond(
+                CompareState.compare_notice != "",
+                rx.text(CompareState.compare_notice, size="1", color="orange"),
+            ),
+            rx.cond(CompareState.compare_series != [], _chart()),
+            spacing="2",
+            width="100%",
+            border="1px solid #444",
+            padding="0.75rem",
+            border_radius="0.5rem",
+        ),
+    )
@@ -10,20 +10,36 @@ def kinematics_panel(bike_id: str, access_token: str) -> rx.Component:
             align="center"
         ),
 
-        # Run solver
-        rx.button(
-            rx.cond(
-                KinematicsState.is_loading,
-                "Running…",
+        # Run solver / cancel the running one
+        rx.cond(
+            KinematicsState.is_loading,
+            rx.button(
+                "Cancel",
+                variant="soft",
+                color_scheme="gray",
+                on_click=KinematicsState.cancel_solver,
+            ),
+            rx.button(
                 "Run solver",
+                on_click=lambda: KinematicsState.load_kinematics(bike_id, access_token),
             ),
-            on_click=lambda: KinematicsState.load_kinematics(bike_id, access_token),
-            disabled=KinematicsState.is_loading,
         ),
 
         _status_row(),
         _travel_section(),
 
+        # the viewer saves geometry directly and presses this after each save
+        rx.button(
+            id="kinematics-geometry-check",
+            display="none",
+            on_click=lambda: KinematicsState.check_geometry(bike_id, access_token),
+        ),
+
+        # re-check on arrival, and (throttled) when the panel's controls get focus
+        on_mount=lambda: KinematicsState.check_geometry(bike_id, access_token),
+        on_focus=lambda: KinematicsState.recheck_geometry(bike_id, access_token),
+        # leaving the analyser aborts a running solve
+        on_unmount=KinematicsState.cancel_solver,
         spacing="3",
         width="100%",
         align="start",
@@ -35,13 +51,35 @@ def kinematics_panel(bike_id: str, access_token: str) -> rx.Component:
 
 def _status_row():
     return rx.cond(
-        KinematicsState.error.is_not_none(),
-        rx.text(KinematicsState.error, color="red"),
+        KinematicsState.is_loading,
+        rx.text(KinematicsState.progress, color="gray"),
 
         rx.cond(
-            KinematicsState.has_result,
+            KinematicsState.error.is_not_none(),
+            rx.text(KinematicsState.error, color="red"),
+
+            rx.cond(
+                KinematicsState.has_result,
+                _freshness_row(),
+                rx.text("No kinematics yet. Run solver.", color="gray"),
+            ),
+        ),
+    )
+
+
+def _freshness_row():
+    return rx.cond(
+        KinematicsState.result_is_current,
+        rx.hstack(
+            rx.text("Result is current.", color="green"),
+            rx.code(KinematicsState.result_fingerprint_short, size="1"),
+            spacing="2",
+            align="center",
+        ),
+        rx.cond(
+            KinematicsState.result_fingerprint != "",
+            rx.text("Geometry changed – re-run solver.", color="orange"),
             rx.text("Solver ran successfully.", color="green"),
-            rx.text("No kinematics yet. Run solver.", color="gray"),
         ),
     )
 
@@ -56,32 +94,94 @@ def _travel_section():
 
 def _travel_list_content():
     header = rx.hstack(
-        rx.text("Step", width="12%", weight="medium"),
-        rx.text("Stroke", width="26%", weight="medium"),
-        rx.text("Travel", width="26%", weight="medium"),
-        rx.text("Leverage", width="26%", weight="medium"),
+        rx.text("Step", width="10%", weight="medium"),
+        rx.text("Stroke", width="16%", weight="medium"),
+        rx.text("Travel", width="16%", weight="medium"),
+        rx.text("Leverage", width="16%", weight="medium"),
+        rx.text("dLR/mm", width="16%", weight="medium"),
+        rx.text("Wheel rate", width="16%", weight="medium"),
         spacing="2",
         width="100%"
     )
 
-    def row(step):
-        return rx.hstack(
-            rx.text(step["step_index"], width="12%"),
-            rx.text(step["shock_stroke"], width="26%"),
-            rx.text(step["rear_travel"], width="26%"),
-            rx.text(step["leverage_ratio"], width="26%"),
-            spacing="2",
-            width="100%",
-        )
+    # One scroll box; /js/step_table.js only mounts the rows in view.
+    table = rx.box(
+        class_name="step-table",
+        data_step_table="1",
+        data_rows=KinematicsState.step_table_rows,
+        data_append=KinematicsState.step_rows_append,
+    )
 
     return rx.vstack(
+        rx.script(src="/js/step_table.js"),
+        _metrics_summary(),
         rx.text("Stroke → Travel / Leverage", weight="medium"),
         header,
-        rx.box(
-            rx.foreach(KinematicsState.solver_steps, row),
-            width="100%",
+        table,
+        spacing="1",
+        width="100%",
+        align="start",
+    )
+
+
+def _sag_row():
+    sag = KinematicsState.sag_point
+    return rx.hstack(
+        rx.text("Sag (%)"),
+        rx.debounce_input(
+            rx.input(
+                value=KinematicsState.sag_percent,
+                type="number",
+                width="5rem",
+                on_change=KinematicsState.set_sag_percent,
+            ),
+            debounce_timeout=300,
+        ),
+        rx.text(
+            "Stroke ", sag["stroke"], " mm · travel ", sag["travel"],
+            " mm · LR ", sag["leverage"],
+        ),
+        rx.cond(
+            KinematicsState.spring_rate > 0,
+            rx.text("· wheel rate ", sag["wheel_rate"], " N/mm", color="gray"),
+        ),
+        spacing="2",
+        align="center",
+        wrap="wrap",
+    )
+
+
+def _metrics_summary():
+    m = KinematicsState.metrics_summary
+    return rx.vstack(
+        rx.hstack(
+            rx.text("Progression ", m["progression_pct"], "%"),
+            rx.text("LR ", m["start_leverage"], " → ", m["end_leverage"]),
+            rx.text("Avg LR ", m["mean_leverage"]),
+            rx.text("Travel ", m["travel_mm"], " mm / stroke ", m["stroke_mm"], " mm"),
+            spacing="4",
+            wrap="wrap",
         ),
+        rx.hstack(
+            rx.text("Spring rate (N/mm)"),
+            rx.input(
+                placeholder="e.g. 80",
+                type="number",
+                width="7rem",
+                on_blur=KinematicsState.set_spring_rate,
+            ),
+            rx.cond(
+                KinematicsState.spring_rate > 0,
+                rx.text(
+                    "Wheel rate ", m["start_wheel_rate"], " → ", m["end_wheel_rate"], " N/mm",
+                    color="gray",
+                ),
+            ),
+            spacing="2",
+            align="center",
+        ),
+        _sag_row(),
         spacing="1",
         width="100%",
         align="start",
-    )
\ No newline at end of file
+    )
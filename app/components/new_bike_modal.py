@@ -141,6 +141,20 @@ def new_bike_modal() -> rx.Component:
             rx.text(BikeState.message, color="red"),
             rx.box(),
         ),
+        rx.cond(
+            BikeState.loading & (BikeState.save_progress != ""),
+            rx.vstack(
+                rx.text(BikeState.save_progress, size="2", opacity="0.8"),
+                rx.cond(
+                    BikeState.upload_bytes_total > 0,
+                    rx.progress(value=BikeState.upload_percent, max=100, width="100%"),
+                    rx.box(),
+                ),
+                spacing="1",
+                width="100%",
+            ),
+            rx.box(),
+        ),
         rx.hstack(
             rx.dialog.close(
                 rx.button(
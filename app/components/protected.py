@@ -1,6 +1,7 @@
 # app/components/protected.py
 import reflex as rx
 from app.state.auth_state import AuthState
+from app.state.page_state import PageState
 
 
 def protected_page(content: rx.Component) -> rx.Component:
@@ -9,4 +10,24 @@ def protected_page(content: rx.Component) -> rx.Component:
         AuthState.access_token,
         content,
         rx.box(),
-    )
\ No newline at end of file
+    )
+
+
+def protected_on_load(*loaders) -> list:
+    """on_load chain for protected pages: auth check and data loads in parallel.
+
+    Replaces [AuthState.ensure_auth_or_redirect, *loaders, PageState.ready].
+    The auth check runs in the background while the loaders fetch; if it
+    fails, whatever the loaders stored is reset and the user goes to /login.
+    discard_if_signed_out repeats the reset once the loaders are done, for
+    loaders that finished after the check failed.
+
+        on_load=protected_on_load(BikeState.load_bikes)
+    """
+    discard_states = sorted({handler.state_full_name for handler in loaders})
+    return [
+        AuthState.ensure_auth_speculative(discard_states),
+        *loaders,
+        AuthState.discard_if_signed_out(discard_states),
+        PageState.ready,
+    ]
@@ -0,0 +1,156 @@
+# app/kinematics.py
+"""Compact storage for solver output.
+
+GET /bikes/{id}/kinematics returns `steps` as a list of dicts, one per
+travel step, repeating the same keys every time. StepColumns keeps them as
+parallel typed arrays instead (struct-of-arrays; float32 is plenty for mm
+and ratios), which is what KinematicsState holds and pickles per session.
+Per-row views are built on demand, only where the UI needs them.
+
+geometry_fingerprint() hashes the solver's inputs, so a result can be
+reused (and shown as current) while the geometry is unchanged.
+"""
+import dataclasses
+import hashlib
+import json
+import math
+from array import array
+from typing import Any, Iterable, Optional, Sequence
+
+from app.metrics import SuspensionMetrics, TravelIndex, compute_metrics
+
+# column name -> array typecode; order is the row order of rows()
+STEP_SCHEMA: dict[str, str] = {
+    "step_index": "i",
+    "shock_stroke": "f",
+    "rear_travel": "f",
+    "leverage_ratio": "f",
+}
+
+
+def _num(v: Any) -> float:
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+@dataclasses.dataclass
+class StepColumns:
+    step_index: array = dataclasses.field(default_factory=lambda: array(STEP_SCHEMA["step_index"]))
+    shock_stroke: array = dataclasses.field(default_factory=lambda: array(STEP_SCHEMA["shock_stroke"]))
+    rear_travel: array = dataclasses.field(default_factory=lambda: array(STEP_SCHEMA["rear_travel"]))
+    leverage_ratio: array = dataclasses.field(default_factory=lambda: array(STEP_SCHEMA["leverage_ratio"]))
+    # memos for metrics() / index(); cleared whenever steps are added
+    _metrics: Optional[SuspensionMetrics] = dataclasses.field(default=None, repr=False, compare=False)
+    _index: Optional[TravelIndex] = dataclasses.field(default=None, repr=False, compare=False)
+
+    @classmethod
+    def from_steps(cls, steps: Iterable[dict]) -> "StepColumns":
+        """Build from the backend's list-of-dicts; missing numbers become NaN."""
+        cols = cls()
+        cols.extend(steps)
+        return cols
+
+    def extend(self, steps: Iterable[dict]):
+        """Append step dicts (e.g. a batch from a streamed response)."""
+        self._metrics = None
+        self._index = None
+        for s in steps:
+            idx = s.get("step_index")
+            self.step_index.append(idx if isinstance(idx, int) else len(self.step_index))
+            self.shock_stroke.append(_num(s.get("shock_stroke")))
+            self.rear_travel.append(_num(s.get("rear_travel")))
+            self.leverage_ratio.append(_num(s.get("leverage_ratio")))
+
+    def __len__(self) -> int:
+        return len(self.step_index)
+
+    def __getstate__(self):
+        # the memos are rebuilt on demand; keep them out of pickled state
+        return {**self.__dict__, "_metrics": None, "_index": None}
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+
+    def column(self, name: str) -> array:
+        if name not in STEP_SCHEMA:
+            raise KeyError(name)
+        return getattr(self, name)
+
+    def metrics(self) -> Optional[SuspensionMetrics]:
+        """Derived metrics (app.metrics), computed once per set of steps."""
+        if self._metrics is None:
+            self._metrics = compute_metrics(self.shock_stroke, self.rear_travel, self.leverage_ratio)
+        return self._metrics
+
+    def index(self) -> TravelIndex:
+        """Sag / stroke / travel lookup table (app.metrics), built once per set of steps."""
+        if self._index is None:
+            self._index = TravelIndex(self.shock_stroke, self.rear_travel, self.leverage_ratio)
+        return self._index
+
+    def rows(self, ndigits: Optional[int] = None, extra: Sequence[Sequence[float]] = ()) -> list[list]:
+        """Row view [step, stroke, travel, leverage, *extra] in STEP_SCHEMA order.
+
+        `extra` are additional per-step columns (e.g. derived curves).
+        NaN/inf become None (JSON null); floats are rounded if ndigits is given.
+        """
+        def cell(v):
+            if isinstance(v, float):
+                if not math.isfinite(v):
+                    return None
+                return round(v, ndigits) if ndigits is not None else v
+            return v
+
+        cols = [self.column(name) for name in STEP_SCHEMA] + list(extra)
+        return [[cell(v) for v in row] for row in zip(*cols)]
+
+
+# ---------- geometry fingerprint ----------
+
+def _canon(v: Any) -> Any:
+    # floats rounded so a save/load round trip doesn't change the hash
+    if isinstance(v, float):
+        return round(v, 6)
+    if isinstance(v, dict):
+        return {k: _canon(v[k]) for k in sorted(v)}
+    if isinstance(v, (list, tuple)):
+        return [_canon(x) for x in v]
+    return v
+
+
+def geometry_fingerprint(
+    points: list,
+    bodies: list,
+    geometry: Optional[dict] = None,
+    solver_options: Optional[dict] = None,
+) -> str:
+    """Stable hash of everything the solver result depends on.
+
+    Points are reduced to id/type/x/y (their solved `coords` trails are
+    output, not input); bodies keep their connectivity, rest length and
+    stroke; the shock stroke is hashed explicitly as well. `geometry` is
+    the bike's geometry block, whose scale_mm_per_px turns pixel
+    positions into the mm the result is reported in.
+    """
+    pts = sorted(
+        ({"id": p.get("id"), "type": p.get("type"), "x": _num(p.get("x")), "y": _num(p.get("y"))}
+         for p in points or []),
+        key=lambda p: str(p["id"]),
+    )
+    bods = sorted(
+        ({k: b.get(k) for k in ("id", "type", "point_ids", "closed", "length0", "stroke")}
+         for b in bodies or []),
+        key=lambda b: str(b["id"]),
+    )
+    shock_stroke = next((b["stroke"] for b in bods if b["type"] == "shock"), None)
+    doc = {
+        "points": pts,
+        "bodies": bods,
+        "shock_stroke": shock_stroke,
+        "geometry": geometry or {},
+        "solver_options": solver_options or {},
+    }
+    blob = json.dumps(_canon(doc), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
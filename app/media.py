@@ -0,0 +1,278 @@
+# app/media.py
+"""Media routes served by the Reflex backend: hero images and thumbnails.
+
+/_media/{id} is a caching proxy for {BACKEND_ORIGIN}/media/{id}. The first
+request streams the original from the backend into a disk cache; after that
+it is served locally with a strong ETag (sha256 of the bytes), range
+support and immutable cache headers – a media id never changes content.
+
+List pages show hero images at ~140–300px, so they use
+/_thumbs/{size}/{id}.webp instead: generated once from the cached original
+(WebP, fixed sizes) and kept under their own LRU size cap.
+
+Tunable via env:
+  MEDIA_CACHE_DIR          where cached / generated files live
+  MEDIA_CACHE_MAX_BYTES    disk budget for proxied originals (LRU evicted)
+  THUMB_CACHE_MAX_BYTES    disk budget for thumbnails (LRU evicted)
+"""
+import asyncio
+import contextlib
+import dataclasses
+import hashlib
+import json
+import os
+import re
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+import httpx
+from PIL import Image, ImageOps
+from reflex.config import get_config
+from starlette.requests import Request
+from starlette.responses import FileResponse, Response
+from starlette.routing import Route
+
+from app.backend import get_client
+from app.offload import run_offloaded
+
+MEDIA_CACHE_DIR = Path(os.getenv("MEDIA_CACHE_DIR", os.path.join(tempfile.gettempdir(), "trigpoint-media")))
+ORIGINAL_DIR = MEDIA_CACHE_DIR / "originals"
+THUMB_DIR = MEDIA_CACHE_DIR / "thumbs"
+MEDIA_CACHE_MAX_BYTES = int(os.getenv("MEDIA_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+THUMB_CACHE_MAX_BYTES = int(os.getenv("THUMB_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+THUMB_SIZES = (160, 320, 640)   # shortest side in px
+DEFAULT_THUMB_SIZE = 320        # 140px cards on 2x screens
+THUMB_QUALITY = 80
+
+MEDIA_ROUTE = "/_media"
+THUMB_ROUTE = "/_thumbs"
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+_MEDIA_ID_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+_CHUNK = 256 * 1024
+
+# one backend download per media id / one generation per (media id, size),
+# even if many browsers request it at once
+_fetching: dict[str, asyncio.Task] = {}
+_generating: dict[str, asyncio.Task] = {}
+
+
+@dataclasses.dataclass
+class CachedMedia:
+    path: Path
+    content_type: str
+    etag: str            # strong: quoted sha256 of the bytes
+    size: int
+
+
+def media_url(media_id: str) -> str:
+    """Absolute URL of the proxied full-size image for a media id."""
+    return f"{get_config().api_url}{MEDIA_ROUTE}/{media_id}"
+
+
+def thumb_url(media_id: str, size: int = DEFAULT_THUMB_SIZE) -> str:
+    """Absolute URL of the cached WebP thumbnail for a media id."""
+    return f"{get_config().api_url}{THUMB_ROUTE}/{size}/{media_id}.webp"
+
+
+def _thumb_path(media_id: str, size: int) -> Path:
+    return THUMB_DIR / f"{media_id}_{size}.webp"
+
+
+def _original_paths(media_id: str) -> tuple[Path, Path]:
+    return ORIGINAL_DIR / media_id, ORIGINAL_DIR / f"{media_id}.json"
+
+
+def _make_thumb(original: Path, size: int, dest: Path):
+    """Resize so the shortest side is `size` (cover-friendly) and save as WebP."""
+    with Image.open(original) as im:
+        im = ImageOps.exif_transpose(im)
+        if im.mode not in ("RGB", "RGBA"):
+            im = im.convert("RGBA" if "transparency" in im.info else "RGB")
+        scale = size / min(im.size)
+        if scale < 1:
+            im = im.resize(
+                (max(1, round(im.width * scale)), max(1, round(im.height * scale))),
+                Image.Resampling.LANCZOS,
+            )
+        THUMB_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = dest.with_suffix(f".{os.getpid()}.tmp")
+        im.save(tmp, "WEBP", quality=THUMB_QUALITY, method=4)
+    os.replace(tmp, dest)
+    _evict_lru(THUMB_DIR, THUMB_CACHE_MAX_BYTES, keep=dest.stem)
+
+
+def _evict_lru(directory: Path, max_bytes: int, keep: Optional[str] = None):
+    """Delete least recently used entries (by mtime) until under max_bytes.
+
+    Files sharing a name up to the first dot (blob + .json sidecar) form one
+    entry and go together; `keep` protects the entry just written.
+    """
+    groups: dict[str, list] = {}
+    total = 0
+    for p in directory.iterdir():
+        try:
+            st = p.stat()
+        except OSError:
+            continue
+        g = groups.setdefault(p.name.partition(".")[0], [0.0, 0, []])
+        g[0] = max(g[0], st.st_mtime)
+        g[1] += st.st_size
+        g[2].append(p)
+        total += st.st_size
+    if total <= max_bytes:
+        return
+    for name, (_, size, paths) in sorted(groups.items(), key=lambda kv: kv[1][0]):
+        if name == keep:
+            continue
+        for p in paths:
+            with contextlib.suppress(OSError):
+                p.unlink()
+        total -= size
+        if total <= max_bytes:
+            break
+
+
+def _touch(*paths: Path):
+    # mtime doubles as the LRU clock
+    for path in paths:
+        with contextlib.suppress(OSError):
+            os.utime(path)
+
+
+def _load_original(media_id: str) -> Optional[CachedMedia]:
+    blob, meta = _original_paths(media_id)
+    try:
+        info = json.loads(meta.read_text())
+        if blob.stat().st_size != info["size"]:
+            return None
+    except (OSError, ValueError, KeyError):
+        return None
+    _touch(blob, meta)
+    return CachedMedia(blob, info["content_type"], info["etag"], info["size"])
+
+
+async def _download(media_id: str) -> Optional[int]:
+    """Stream the original from the backend into the cache; returns an error status or None."""
+    blob, meta = _original_paths(media_id)
+    tmp = blob.with_suffix(f".{os.getpid()}.tmp")
+    ORIGINAL_DIR.mkdir(parents=True, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        async with get_client().stream("GET", f"/media/{media_id}", timeout=30.0) as r:
+            if r.status_code == 404:
+                return 404
+            if r.status_code != 200:
+                return 502
+            content_type = r.headers.get("content-type", "application/octet-stream")
+            with open(tmp, "wb") as fh:
+                async for chunk in r.aiter_bytes(_CHUNK):
+                    digest.update(chunk)
+                    size += len(chunk)
+                    await run_offloaded(fh.write, chunk)
+    except (httpx.HTTPError, OSError):
+        tmp.unlink(missing_ok=True)
+        return 502
+
+    info = {"content_type": content_type, "etag": f'"{digest.hexdigest()}"', "size": size}
+    meta.write_text(json.dumps(info))
+    os.replace(tmp, blob)
+    await run_offloaded(_evict_lru, ORIGINAL_DIR, MEDIA_CACHE_MAX_BYTES, media_id)
+    return None
+
+
+async def _single_flight(registry: dict, key: str, make) -> Optional[int]:
+    task = registry.get(key)
+    if task is None:
+        task = asyncio.ensure_future(make())
+        registry[key] = task
+        task.add_done_callback(lambda _: registry.pop(key, None))
+    try:
+        # shield: a client disconnecting must not abort the shared work
+        return await asyncio.shield(task)
+    except Exception:
+        return 502
+
+
+async def ensure_original(media_id: str) -> tuple[Optional[CachedMedia], Optional[int]]:
+    """Return the cached original, downloading it first on a miss.
+
+    Returns (media, None) or (None, error_status).
+    """
+    cached = await run_offloaded(_load_original, media_id)
+    if cached is not None:
+        return cached, None
+    error = await _single_flight(_fetching, media_id, lambda: _download(media_id))
+    if error:
+        return None, error
+    cached = await run_offloaded(_load_original, media_id)
+    return (cached, None) if cached is not None else (None, 502)
+
+
+async def _generate(media_id: str, size: int) -> Optional[int]:
+    """Write the thumbnail from the cached original; returns an error status or None."""
+    original, error = await ensure_original(media_id)
+    if error:
+        return error
+    try:
+        await run_offloaded(_make_thumb, original.path, size, _thumb_path(media_id, size))
+    except (OSError, Image.DecompressionBombError):
+        return 415
+    return None
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    # If-None-Match uses weak comparison
+    tags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+async def serve_media(request: Request) -> Response:
+    media_id = request.path_params["media_id"]
+    if not _MEDIA_ID_RE.match(media_id):
+        return Response(status_code=404)
+
+    cached, error = await ensure_original(media_id)
+    if error:
+        return Response(status_code=error)
+
+    headers = {"ETag": cached.etag, "Cache-Control": IMMUTABLE, "X-Content-Type-Options": "nosniff"}
+    if _etag_matches(request.headers.get("if-none-match", ""), cached.etag):
+        return Response(status_code=304, headers=headers)
+
+    # Only ever hand proxied bytes back as an image (or opaque blob).
+    media_type = cached.content_type
+    if not media_type.startswith("image/") or "svg" in media_type:
+        media_type = "application/octet-stream"
+    # FileResponse handles Range / If-Range against our ETag
+    return FileResponse(cached.path, media_type=media_type, headers=headers)
+
+
+async def serve_thumb(request: Request) -> Response:
+    media_id = request.path_params["media_id"]
+    try:
+        size = int(request.path_params["size"])
+    except ValueError:
+        return Response(status_code=404)
+    if size not in THUMB_SIZES or not _MEDIA_ID_RE.match(media_id):
+        return Response(status_code=404)
+
+    path = _thumb_path(media_id, size)
+    if not path.exists():
+        key = f"{media_id}_{size}"
+        error = await _single_flight(_generating, key, lambda: _generate(media_id, size))
+        if error:
+            return Response(status_code=error)
+    else:
+        await run_offloaded(_touch, path)
+
+    return FileResponse(path, media_type="image/webp", headers={"Cache-Control": IMMUTABLE})
+
+
+routes = [
+    Route(MEDIA_ROUTE + "/{media_id}", serve_media, methods=["GET", "HEAD"]),
+    Route(THUMB_ROUTE + "/{size}/{media_id}.webp", serve_thumb, methods=["GET", "HEAD"]),
+]
@@ -0,0 +1,159 @@
+# app/metrics.py
+"""Derived suspension metrics over solver output.
+
+compute_metrics() walks the solver columns (see app.kinematics.StepColumns)
+once and returns the derived curves and scalars the kinematics panel shows.
+StepColumns.metrics() memoizes the result until the steps change, so the
+computed vars reading it don't redo the work on every state update.
+
+TravelIndex is a monotone lookup table over the same columns: stroke at a
+sag %, travel at a stroke, leverage at a travel – O(log n) each, no new
+solver run.
+
+Pure Python over typed arrays: a few ms at thousands of steps.
+"""
+import bisect
+import dataclasses
+import math
+from array import array
+from typing import Iterable, Optional
+
+
+@dataclasses.dataclass(frozen=True)
+class SuspensionMetrics:
+    # per step, aligned with the solver rows (NaN where undefined)
+    leverage_slope: array        # d(leverage ratio) / d(rear travel), per mm
+    # scalars
+    start_leverage: float
+    end_leverage: float
+    mean_leverage: float         # total travel / total stroke
+    progression_pct: float       # (start - end) / start * 100; > 0 is progressive
+    travel_mm: float
+    stroke_mm: float
+
+
+def _first_finite(values) -> float:
+    return next((v for v in values if math.isfinite(v)), math.nan)
+
+
+def compute_metrics(shock_stroke: array, rear_travel: array, leverage_ratio: array) -> Optional[SuspensionMetrics]:
+    """Derive curves + scalars from the parallel solver columns; None if empty."""
+    n = len(leverage_ratio)
+    if n == 0:
+        return None
+
+    slope = array("d", bytes(8 * n))
+    for i in range(n):
+        # central difference inside, one-sided at the ends
+        lo, hi = (i - 1 if i > 0 else i), (i + 1 if i < n - 1 else i)
+        dt = rear_travel[hi] - rear_travel[lo]
+        slope[i] = (leverage_ratio[hi] - leverage_ratio[lo]) / dt if dt else math.nan
+
+    start_lr = _first_finite(leverage_ratio)
+    end_lr = _first_finite(reversed(leverage_ratio))
+    travel = _first_finite(reversed(rear_travel)) - _first_finite(rear_travel)
+    stroke = _first_finite(reversed(shock_stroke)) - _first_finite(shock_stroke)
+
+    return SuspensionMetrics(
+        leverage_slope=slope,
+        start_leverage=start_lr,
+        end_leverage=end_lr,
+        mean_leverage=travel / stroke if stroke else math.nan,
+        progression_pct=(start_lr - end_lr) / start_lr * 100 if start_lr else math.nan,
+        travel_mm=travel,
+        stroke_mm=stroke,
+    )
+
+
+def wheel_rate(spring_rate: float, leverage: float) -> float:
+    """Spring rate at the wheel: k / LR² (same units as spring_rate)."""
+    if not spring_rate or not leverage or not math.isfinite(leverage):
+        return math.nan
+    return spring_rate / (leverage * leverage)
+
+
+def _monotone(xs: array, *ys: array) -> tuple[array, ...]:
+    """Rows with finite values and strictly increasing x, in order."""
+    out = [array("d") for _ in range(1 + len(ys))]
+    last = -math.inf
+    for row in zip(xs, *ys):
+        if not all(math.isfinite(v) for v in row) or row[0] <= last:
+            continue
+        last = row[0]
+        for col, v in zip(out, row):
+            col.append(v)
+    return tuple(out)
+
+
+def _interp(xs: array, ys: array, x: float) -> float:
+    """Piecewise-linear y(x) on increasing xs, clamped to the table ends."""
+    n = len(xs)
+    if n == 0 or not math.isfinite(x):
+        return math.nan
+    if x <= xs[0]:
+        return ys[0]
+    if x >= xs[-1]:
+        return ys[-1]
+    i = bisect.bisect_right(xs, x)
+    x0, x1 = xs[i - 1], xs[i]
+    return ys[i - 1] + (ys[i] - ys[i - 1]) * (x - x0) / (x1 - x0)
+
+
+class TravelIndex:
+    """Precomputed interpolation tables over one solver result.
+
+    Built once per set of steps (StepColumns.index()); rows where stroke
+    (or travel) isn't strictly increasing are dropped so every lookup is a
+    bisect on a monotone table.
+    """
+
+    def __init__(self, shock_stroke: array, rear_travel: array, leverage_ratio: array):
+        self._by_stroke = _monotone(shock_stroke, rear_travel, leverage_ratio)
+        self._by_travel = _monotone(rear_travel, leverage_ratio)
+
+    def __len__(self) -> int:
+        return len(self._by_stroke[0])
+
+    def stroke_at_sag(self, sag_percent: float) -> float:
+        """Shock stroke (mm) used at `sag_percent` of total shock stroke."""
+        stroke = self._by_stroke[0]
+        if not stroke:
+            return math.nan
+        return stroke[0] + (stroke[-1] - stroke[0]) * sag_percent / 100
+
+    def travel_at_stroke(self, stroke: float) -> float:
+        s, travel, _ = self._by_stroke
+        return _interp(s, travel, stroke)
+
+    def leverage_at_stroke(self, stroke: float) -> float:
+        s, _, leverage = self._by_stroke
+        return _interp(s, leverage, stroke)
+
+    def leverage_at_travel(self, travel: float) -> float:
+        t, leverage = self._by_travel
+        return _interp(t, leverage, travel)
+
+    def sag_point(self, sag_percent: float) -> dict[str, float]:
+        stroke = self.stroke_at_sag(sag_percent)
+        return {
+            "sag_percent": sag_percent,
+            "stroke": stroke,
+            "travel": self.travel_at_stroke(stroke),
+            "leverage": self.leverage_at_stroke(stroke),
+        }
+
+    def sag_points(self, sag_percents: Iterable[float]) -> list[dict[str, float]]:
+        """Operating points for many sag values at once."""
+        return [self.sag_point(p) for p in sag_percents]
+
+    def leverage_on_grid(self, step: float) -> array:
+        """Leverage at travel 0, step, 2*step, … up to this bike's max travel.
+
+        A fixed grid (not one spanning all bikes) keeps the result valid when
+        other bikes join a comparison.
+        """
+        travel = self._by_travel[0]
+        if not travel or step <= 0:
+            return array("d")
+        n = int(travel[-1] // step) + 1
+        return array("d", (self.leverage_at_travel(i * step) for i in range(n)))
@@ -0,0 +1,86 @@
+# app/offload.py
+"""Run CPU-heavy work (base64, image processing) off the asyncio event loop.
+
+All Reflex sessions in a worker share one event loop, so a multi-MB encode
+inside an event handler stalls every other websocket. Handlers should
+`await run_offloaded(fn, *args)` instead, which uses a bounded thread pool.
+
+Also measures event-loop lag (how late a periodic timer fires) so stalls
+show up in loop_stats(), served at GET /_stats (app/app.py).
+
+Tunable via env:
+  OFFLOAD_WORKERS          thread pool size
+  LOOP_LAG_INTERVAL        seconds between lag probes
+  LOOP_LAG_WARN_MS         lag above this is counted (and logged) as a stall
+"""
+import asyncio
+import contextlib
+import functools
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+OFFLOAD_WORKERS = int(os.getenv("OFFLOAD_WORKERS", "4"))
+LOOP_LAG_INTERVAL = float(os.getenv("LOOP_LAG_INTERVAL", "0.25"))
+LOOP_LAG_WARN_MS = float(os.getenv("LOOP_LAG_WARN_MS", "50"))
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+# Event-loop blocking metrics (see loop_stats()).
+stats = {
+    "samples": 0,
+    "stalls": 0,              # probes that fired more than LOOP_LAG_WARN_MS late
+    "blocked_ms_total": 0.0,  # summed lateness of those stalls
+    "lag_ms_max": 0.0,
+    "lag_ms_last": 0.0,
+    "offloaded_calls": 0,
+}
+
+
+def loop_stats() -> dict:
+    """Snapshot of the event-loop lag and offload counters."""
+    return dict(stats)
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=OFFLOAD_WORKERS, thread_name_prefix="offload")
+    return _executor
+
+
+async def run_offloaded(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run fn(*args, **kwargs) in the bounded pool and await the result."""
+    stats["offloaded_calls"] += 1
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), functools.partial(fn, *args, **kwargs))
+
+
+async def _monitor_loop_lag():
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(LOOP_LAG_INTERVAL)
+        lag_ms = max(0.0, (loop.time() - start - LOOP_LAG_INTERVAL) * 1000)
+        stats["samples"] += 1
+        stats["lag_ms_last"] = lag_ms
+        stats["lag_ms_max"] = max(stats["lag_ms_max"], lag_ms)
+        if lag_ms > LOOP_LAG_WARN_MS:
+            stats["stalls"] += 1
+            stats["blocked_ms_total"] += lag_ms
+            print(f"Event loop blocked for {lag_ms:.0f} ms at {time.strftime('%H:%M:%S')}")
+
+
+@contextlib.asynccontextmanager
+async def offload_lifespan():
+    """Reflex lifespan task: start the lag monitor, shut the pool down on exit."""
+    global _executor
+    monitor = asyncio.create_task(_monitor_loop_lag())
+    try:
+        yield
+    finally:
+        monitor.cancel()
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
@@ -3,7 +3,7 @@ import reflex as rx
 
 from app.components.template import app_template
 from app.components.page_loading import page_loading
-from app.components.protected import protected_page
+from app.components.protected import protected_page, protected_on_load
 from app.state.auth_state import AuthState
 from app.state.page_state import PageState
 from app.state.bike_state import BikeState
@@ -244,11 +244,7 @@ def details_section() -> rx.Component:
 @rx.page(
     route="/bike_analyser/[bike_id]",
     title="Bike Analyser",
-    on_load=[
-        AuthState.ensure_auth_or_redirect,
-        BikeState.load_one_bike,
-        PageState.ready,
-    ],
+    on_load=protected_on_load(BikeState.load_one_bike),
 )
 def bike_analyser() -> rx.Component:
     viewer = rx.box(
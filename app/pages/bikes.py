@@ -1,26 +1,106 @@
 # frontend/app/pages/bikes.py
 import os
+from typing import Dict, List
+
 import reflex as rx
 
 from app.components.template import app_template
 from app.components.page_loading import page_loading
-from app.components.protected import protected_page
+from app.components.protected import protected_page, protected_on_load
 from app.state.auth_state import AuthState
 from app.state.page_state import PageState
+from app.state.bike_rows import bike_rows
 from app.state.bike_state import BikeState
 
 from app.components.new_bike_modal import new_bike_modal
 
 BACKEND_ORIGIN = os.getenv("BACKEND_ORIGIN", "http://127.0.0.1:9000")
+SEARCH_DEBOUNCE_MS = 200
+
+# Clicks "Load more" once it gets within ~2 screens of the viewport. The
+# button is keyed on the row count, so it re-mounts (and re-arms) after
+# every page, whether that came from the backend or the local buffer.
+_AUTOLOAD_JS = """
+(() => {
+  const el = document.getElementById("bikes-load-more");
+  if (!el || !("IntersectionObserver" in window)) return;
+  const io = new IntersectionObserver((entries) => {
+    if (entries.some((e) => e.isIntersecting)) {
+      io.disconnect();
+      el.click();
+    }
+  }, { rootMargin: "1200px 0px" });
+  io.observe(el);
+})()
+"""
+
+
+def load_more_button() -> rx.Component:
+    return rx.cond(
+        BikeState.has_more_bikes,
+        rx.cond(
+            BikeState.loading_more,
+            rx.center(rx.spinner(), width="100%", padding_y="2"),
+            rx.center(
+                rx.button(
+                    "Load more",
+                    id="bikes-load-more",
+                    variant="soft",
+                    on_click=BikeState.load_more_bikes,
+                    on_mount=rx.call_script(_AUTOLOAD_JS),
+                ),
+                key=BikeState.bikes_shown,
+                width="100%",
+            ),
+        ),
+    )
+
+
+def search_box() -> rx.Component:
+    return rx.debounce_input(
+        rx.input(
+            placeholder="Search bikes + catalog...",
+            value=BikeState.search_query,
+            on_change=BikeState.set_search_query,
+            width="250px",
+        ),
+        debounce_timeout=SEARCH_DEBOUNCE_MS,
+    )
+
+
+def search_results() -> rx.Component:
+    def result_row(r: dict) -> rx.Component:
+        row = rx.hstack(
+            rx.text(r["title"], weight="medium", size="2"),
+            rx.spacer(),
+            rx.text(r["detail"], size="1", color="var(--gray-10)"),
+            width="100%",
+            padding_x="0.5rem",
+            padding_y="0.25rem",
+        )
+        return rx.cond(
+            r["kind"] == "bike",
+            rx.box(row, on_click=BikeState.goto_bike(r["id"]), cursor="pointer", width="100%"),
+            row,
+        )
+
+    return rx.cond(
+        BikeState.search_query != "",
+        rx.card(
+            rx.cond(
+                BikeState.search_results.length() > 0,
+                rx.vstack(rx.foreach(BikeState.search_results, result_row), spacing="0", width="100%"),
+                rx.text("No matches.", size="2"),
+            ),
+            width="100%",
+        ),
+    )
+
 
 @rx.page(
     route="/bikes",
     title="My bikes",
-    on_load=[
-        AuthState.ensure_auth_or_redirect, 
-        BikeState.load_bikes,
-        PageState.ready,
-        ],
+    on_load=protected_on_load(BikeState.load_bikes),
 )
 def bikes_page() -> rx.Component:
 
@@ -108,10 +188,12 @@ def bikes_page() -> rx.Component:
         rx.hstack(
             rx.heading("My bikes", size="6"),
             rx.spacer(),
+            search_box(),
             new_bike_modal(),
             align_items="center",
             width="100%",
         ),
+        search_results(),
 
         # Body: loading → list → empty state
         rx.cond(
@@ -119,15 +201,18 @@ def bikes_page() -> rx.Component:
             rx.text("Loading bikes..."),
             rx.cond(
                 BikeState.has_bikes,
-                rx.vstack(
-                    # 🔥 This will render ALL bikes in BikeState.bikes
-                    rx.foreach(BikeState.bikes, bike_card),
-                    spacing="3",
-                    width="100%",
-                ),
+                rx.fragment(),
                 rx.text("You have no bikes yet. Add one!", size="3"),
             ),
         ),
+        # Kept mounted so the browser-side rows survive loading / empty states.
+        rx.vstack(
+            # pages already scrolled into view; more load at the end
+            rx.foreach(bike_rows.value.to(List[Dict]), bike_card),
+            rx.cond(BikeState.loading, rx.fragment(), load_more_button()),
+            spacing="3",
+            width="100%",
+        ),
         # Any status / error message
         rx.cond(
             BikeState.message != "",
@@ -5,18 +5,26 @@ from app.state.auth_state import AuthState
 from app.state.page_state import PageState
 from app.state.bike_state import BikeState
 from app.components.template import app_template
+from app.components.compare_panel import compare_panel, compare_toggle
+from app.state.shed_solve_state import ShedSolveState
 from app.components.page_loading import page_loading
-from app.components.protected import protected_page
+from app.components.protected import protected_page, protected_on_load
+
+# Filter inputs send their value once typing pauses, not on every keystroke.
+FILTER_DEBOUNCE_MS = 200
+
+
+def _filter_input(**props) -> rx.Component:
+    return rx.debounce_input(rx.input(**props), debounce_timeout=FILTER_DEBOUNCE_MS)
 
 
 @rx.page(
     route="/sheds/[shed_id]",
     title="Bike shed",
-    on_load=[
-        AuthState.ensure_auth_or_redirect,
+    on_load=protected_on_load(
         ShedState.load_shed_detail,   # loads current_shed + shed_bikes
-        PageState.ready,              # hide loader when done
-    ],
+        ShedSolveState.sync_shed,     # forget another shed's solve statuses
+    ),
 )
 def shed_detail_page() -> rx.Component:
     # ---------- Filter + table block ----------
@@ -29,7 +37,7 @@ def shed_detail_page() -> rx.Component:
                 on_click=ShedState.toggle_filter_open,
             ),
             rx.spacer(),
-            rx.input(
+            _filter_input(
                 placeholder="Search brand / model / year...",
                 value=ShedState.text_filter,
                 on_change=ShedState.set_text_filter,
@@ -47,7 +55,7 @@ def shed_detail_page() -> rx.Component:
                             rx.table.column_header_cell(
                                 rx.vstack(
                                     rx.text("Brand", weight="medium", size="2"),
-                                    rx.input(
+                                    _filter_input(
                                         placeholder="Filter brand",
                                         value=ShedState.brand_filter,
                                         on_change=ShedState.set_brand_filter,
@@ -59,7 +67,7 @@ def shed_detail_page() -> rx.Component:
                             rx.table.column_header_cell(
                                 rx.vstack(
                                     rx.text("Model", weight="medium", size="2"),
-                                    rx.input(
+                                    _filter_input(
                                         placeholder="Filter model",
                                         value=ShedState.model_filter,
                                         on_change=ShedState.set_model_filter,
@@ -71,7 +79,7 @@ def shed_detail_page() -> rx.Component:
                             rx.table.column_header_cell(
                                 rx.vstack(
                                     rx.text("Year", weight="medium", size="2"),
-                                    rx.input(
+                                    _filter_input(
                                         placeholder="Year",
                                         value=ShedState.year_filter,
                                         on_change=ShedState.set_year_filter,
@@ -143,7 +151,11 @@ def shed_detail_page() -> rx.Component:
         bike_image = rx.cond(
             b.get("hero_url") != None,
             rx.image(
-                src=b.get("hero_url"),
+                src=rx.cond(
+                    b.get("hero_thumb_url"),
+                    b.get("hero_thumb_url"),
+                    b.get("hero_url"),
+                ),
                 width="100%",
                 height="100%",
                 object_fit="cover",
@@ -170,7 +182,13 @@ def shed_detail_page() -> rx.Component:
                 border_radius="0.75rem",
                 overflow="hidden",
             ),
-            rx.text(b.get("name", "Untitled"), size="3", weight="medium"),
+            rx.hstack(
+                rx.text(b.get("name", "Untitled"), size="3", weight="medium"),
+                rx.spacer(),
+                compare_toggle(b),
+                align="center",
+                width="100%",
+            ),
             rx.text(b.get("brand", ""), size="2", color="gray"),
             rx.text(
                 rx.cond(
@@ -181,6 +199,16 @@ def shed_detail_page() -> rx.Component:
                 size="2",
                 color="gray",
             ),
+            # "solve all" progress / result for this bike
+            rx.text(
+                rx.cond(
+                    ShedSolveState.bike_summary.contains(b["id"].to(str)),
+                    ShedSolveState.bike_summary[b["id"].to(str)],
+                    ShedSolveState.bike_status.get(b["id"].to(str), ""),
+                ),
+                size="1",
+                color="gray",
+            ),
             spacing="1",
             align_items="flex-start",
             width="100%",
@@ -219,8 +247,23 @@ def shed_detail_page() -> rx.Component:
     body = rx.vstack(
         shed_header,
         filter_panel,
-        rx.heading("Bikes in this shed", size="4"),
+        rx.hstack(
+            rx.heading("Bikes in this shed", size="4"),
+            rx.spacer(),
+            rx.text(ShedSolveState.solve_progress, size="2", color="gray"),
+            rx.cond(
+                ShedSolveState.solving,
+                rx.button("Cancel", size="2", variant="soft", color_scheme="gray",
+                          on_click=ShedSolveState.cancel_solve_all),
+                rx.button("Solve all", size="2", variant="soft",
+                          on_click=ShedSolveState.solve_all,
+                          disabled=ShedState.shed_bikes == []),
+            ),
+            align="center",
+            width="100%",
+        ),
         bikes_section,
+        compare_panel(),
         spacing="4",
         width="100%",
     )
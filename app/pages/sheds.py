@@ -2,7 +2,7 @@
 import reflex as rx
 from app.components.template import app_template
 from app.components.page_loading import page_loading
-from app.components.protected import protected_page
+from app.components.protected import protected_page, protected_on_load
 from app.state.auth_state import AuthState
 from app.state.page_state import PageState
 from app.state.shed_state import ShedState
@@ -11,11 +11,7 @@ from app.state.shed_state import ShedState
 @rx.page(
     route="/sheds",
     title="Bike Sheds",
-    on_load=[
-        AuthState.ensure_auth_or_redirect,
-        ShedState.load_sheds,
-        PageState.ready,
-    ],
+    on_load=protected_on_load(ShedState.load_sheds),
 )
 def sheds_page() -> rx.Component:
     # ---------- Local helpers: tile_card + tile_grid ----------
@@ -0,0 +1,302 @@
+# app/search.py
+"""Search over the bike picker (ShedState.filtered_bikes).
+
+BikeSearchIndex normalizes every bike once, when the list loads: brand,
+name and year strings, plus maps from each distinct brand, name, year
+and token to the rows that carry it. A query then costs one scan over the
+distinct values (far fewer than bikes) and set intersections, instead of
+re-lowercasing every bike on every keystroke.
+
+Filtering is incremental: when a query only narrows the previous one
+(a filter grew, nothing was removed) just the previous result is
+re-checked.
+
+Building an index is the expensive part (~0.3 s at 5000 bikes with the
+trigram index), so ShedState builds it once per load via run_offloaded.
+
+TrigramIndex adds typo-tolerant matching ("megatowr", "santacruz") over
+user bikes and the catalog (assets/dev/catelog.json): ranked, with the
+work per query bounded, and updated per document as bikes come and go.
+"""
+import functools
+import heapq
+import json
+import re
+import unicodedata
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+_TOKEN = re.compile(r"\w+")
+
+
+def normalize(value) -> str:
+    """Casefolded, accent-stripped, single-spaced text ("Škoda  X" -> "skoda x")."""
+    s = unicodedata.normalize("NFKD", str(value or ""))
+    s = "".join(c for c in s if not unicodedata.combining(c)).casefold()
+    return " ".join(s.split())
+
+
+def tokens(value) -> List[str]:
+    return _TOKEN.findall(normalize(value))
+
+
+# Near misses appended to the picker's exact matches.
+PICKER_FUZZY_LIMIT = 50
+
+# (brand, model, year, text) -- all normalized; text as a token tuple
+Query = Tuple[str, str, str, Tuple[str, ...]]
+
+
+def _narrows(new: Query, old: Query) -> bool:
+    """True if every row matching `new` also matches `old`."""
+    nb, nm, ny, nt = new
+    ob, om, oy, ot = old
+    return (
+        ob in nb
+        and om in nm
+        and (not oy or oy == ny)
+        and all(any(o in n for n in nt) for o in ot)
+    )
+
+
+class BikeSearchIndex:
+    """Normalized fields + token maps over one list of bikes (by position).
+
+    With fuzzy=False the trigram index is skipped and filter() returns
+    exact matches only.
+    """
+
+    def __init__(self, bikes: Sequence[Dict], fuzzy: bool = True):
+        self.size = len(bikes)
+        self._brand: List[str] = []
+        self._name: List[str] = []
+        self._year: List[str] = []
+        self._tokens: List[Tuple[str, ...]] = []
+        # distinct value / token -> rows
+        self._by_brand: Dict[str, Set[int]] = {}
+        self._by_name: Dict[str, Set[int]] = {}
+        self._by_year: Dict[str, Set[int]] = {}
+        self._by_token: Dict[str, Set[int]] = {}
+        self._fuzzy: Optional[TrigramIndex] = TrigramIndex() if fuzzy else None
+        for i, b in enumerate(bikes):
+            brand = normalize(b.get("brand"))
+            name = normalize(b.get("name"))
+            year = normalize(b.get("model_year"))
+            toks = tuple(dict.fromkeys(tokens(f"{brand} {name} {year}")))
+            self._brand.append(brand)
+            self._name.append(name)
+            self._year.append(year)
+            self._tokens.append(toks)
+            self._by_brand.setdefault(brand, set()).add(i)
+            self._by_name.setdefault(name, set()).add(i)
+            self._by_year.setdefault(year, set()).add(i)
+            for t in toks:
+                self._by_token.setdefault(t, set()).add(i)
+            if self._fuzzy is not None:
+                self._fuzzy.add(str(i), bike_fields(b))
+        # last query and its result, for incremental narrowing
+        self._last: Optional[Tuple[Query, List[int]]] = None
+
+    @staticmethod
+    def query(brand: str = "", model: str = "", year: str = "", text: str = "") -> Query:
+        return normalize(brand), normalize(model), normalize(year), tuple(tokens(text))
+
+    def _matches(self, i: int, q: Query) -> bool:
+        brand, model, year, text = q
+        return (
+            brand in self._brand[i]
+            and model in self._name[i]
+            and (not year or year == self._year[i])
+            and all(any(t in tok for tok in self._tokens[i]) for t in text)
+        )
+
+    @staticmethod
+    def _containing(table: Dict[str, Set[int]], needle: str) -> Set[int]:
+        rows: Set[int] = set()
+        for value, hits in table.items():
+            if needle in value:
+                rows |= hits
+        return rows
+
+    def _full(self, q: Query) -> List[int]:
+        brand, model, year, text = q
+        candidates: List[Set[int]] = []
+        if year:
+            candidates.append(self._by_year.get(year, set()))
+        if brand:
+            candidates.append(self._containing(self._by_brand, brand))
+        if model:
+            candidates.append(self._containing(self._by_name, model))
+        for t in text:
+            candidates.append(self._containing(self._by_token, t))
+        if not candidates:
+            return list(range(self.size))
+        rows = set.intersection(*sorted(candidates, key=len))
+        return sorted(rows)
+
+    def search(self, q: Query) -> List[int]:
+        """Rows (in list order) matching all filters of `q`."""
+        last = self._last
+        if last is not None and last[0] == q:
+            return last[1]
+        if last is not None and _narrows(q, last[0]):
+            rows = [i for i in last[1] if self._matches(i, q)]
+        else:
+            rows = self._full(q)
+        self._last = (q, rows)
+        return rows
+
+    def filter(self, bikes: Sequence[Dict], q: Query, fuzzy_text: str = "") -> List[Dict]:
+        """Matching bikes; with `fuzzy_text`, near misses follow, best first."""
+        rows = self.search(q)
+        if fuzzy_text and self._fuzzy is not None:
+            exact = set(rows)
+            columns_only = (*q[:3], ())
+            rows = rows + [
+                i for i in (int(d) for d, _ in self._fuzzy.search(fuzzy_text, PICKER_FUZZY_LIMIT))
+                if i not in exact and self._matches(i, columns_only)
+            ]
+        return [bikes[i] for i in rows]
+
+
+
+# ---------- fuzzy (trigram) search ----------
+
+# Query trigrams looked up per search, rarest first; bounds the work on
+# long queries.
+MAX_QUERY_GRAMS = 24
+# Documents scored per search; once reached, further grams only add
+# hits to documents already in the running.
+MAX_CANDIDATES = 500
+# Share of the query's trigrams a document must contain to match.
+MIN_FUZZY_SCORE = 0.5
+
+
+def _compact(value) -> str:
+    # spaces and punctuation dropped, so "santacruz" meets "Santa Cruz"
+    return "".join(tokens(value))
+
+
+def trigrams(value) -> Set[str]:
+    s = _compact(value)
+    if not s:
+        return set()
+    s = f"${s}$"
+    return {s[i:i + 3] for i in range(len(s) - 2)}
+
+
+class TrigramIndex:
+    """Inverted index from trigrams to document ids, updated in place.
+
+    Documents are a few short fields (brand, model, nickname, year); each
+    field and their concatenation contribute trigrams, so a query can be
+    one field ("megatowr") or several run together ("santacruz mega").
+    """
+
+    def __init__(self):
+        self._grams: Dict[str, Set[str]] = {}       # doc id -> its trigrams
+        self._postings: Dict[str, Set[str]] = {}    # trigram -> doc ids
+
+    def __len__(self) -> int:
+        return len(self._grams)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._grams
+
+    def add(self, doc_id: str, fields: Sequence):
+        """Index (or re-index) one document."""
+        if doc_id in self._grams:
+            self.remove(doc_id)
+        grams = trigrams(" ".join(str(f) for f in fields if f))
+        for f in fields:
+            grams |= trigrams(f)
+        self._grams[doc_id] = grams
+        for g in grams:
+            self._postings.setdefault(g, set()).add(doc_id)
+
+    def remove(self, doc_id: str):
+        for g in self._grams.pop(doc_id, ()):
+            docs = self._postings.get(g)
+            if docs is not None:
+                docs.discard(doc_id)
+                if not docs:
+                    del self._postings[g]
+
+    def sync(self, docs: Dict[str, Sequence]):
+        """Make the index hold exactly `docs` (id -> fields), touching only changes."""
+        for doc_id in [d for d in self._grams if d not in docs]:
+            self.remove(doc_id)
+        for doc_id, fields in docs.items():
+            if doc_id not in self._grams:
+                self.add(doc_id, fields)
+
+    def search(self, query: str, limit: int = 20) -> List[Tuple[str, float]]:
+        """Best `limit` (doc id, score) pairs, score = share of query trigrams found."""
+        query_grams = trigrams(query)
+        grams = sorted(
+            (g for g in query_grams if g in self._postings),
+            key=lambda g: len(self._postings[g]),
+        )[:MAX_QUERY_GRAMS]
+        if not grams:
+            return []
+        hits: Dict[str, int] = {}
+        for g in grams:
+            for doc_id in self._postings[g]:
+                if doc_id in hits:
+                    hits[doc_id] += 1
+                elif len(hits) < MAX_CANDIDATES:
+                    hits[doc_id] = 1
+        wanted = min(len(query_grams), MAX_QUERY_GRAMS)
+        need = max(1, MIN_FUZZY_SCORE * wanted)
+        scored = [
+            # ties go to the shorter document (closer to the query)
+            (n / wanted, -len(self._grams[d]), d)
+            for d, n in hits.items() if n >= need
+        ]
+        return [(d, round(s, 3)) for s, _, d in heapq.nlargest(limit, scored)]
+
+
+def bike_fields(bike: Dict) -> Tuple:
+    """Searchable fields of a user bike (BikeOut)."""
+    return (bike.get("brand"), bike.get("name"), bike.get("nickname"), bike.get("model_year"))
+
+
+# ---------- catalog ----------
+
+CATALOG_PATH = Path(__file__).resolve().parent.parent / "assets" / "dev" / "catelog.json"
+
+_LINE_COMMENT = re.compile(r"(?m)(?<=[\s,])//[^\n]*$")
+
+
+def _catalog_id(entry: Dict) -> str:
+    oid = entry.get("_id")
+    if isinstance(oid, dict):
+        oid = oid.get("$oid")
+    return str(oid or f"{entry.get('brand')}/{entry.get('model')}/{entry.get('model_year_start')}")
+
+
+@functools.lru_cache(maxsize=1)
+def catalog_entries() -> Dict[str, Dict]:
+    """Catalog entries by id (the dev file is one entry or a list, with // comments)."""
+    try:
+        raw = CATALOG_PATH.read_text(encoding="utf-8")
+        data = json.loads(_LINE_COMMENT.sub("", raw))
+    except (OSError, ValueError) as e:
+        print(f"[search] catalog not loaded: {e}")
+        return {}
+    entries = data if isinstance(data, list) else [data]
+    return {_catalog_id(e): e for e in entries if isinstance(e, dict)}
+
+
+def catalog_fields(entry: Dict) -> Tuple:
+    start, end = entry.get("model_year_start"), entry.get("model_year_end")
+    years = " ".join(str(y) for y in range(start, end + 1)) if isinstance(start, int) and isinstance(end, int) else start
+    return (entry.get("brand"), entry.get("model"), entry.get("category"), years)
+
+
+@functools.lru_cache(maxsize=1)
+def catalog_index() -> TrigramIndex:
+    index = TrigramIndex()
+    for cid, entry in catalog_entries().items():
+        index.add(cid, catalog_fields(entry))
+    return index
@@ -1,19 +1,81 @@
+import base64
+import json as jsonlib
 import os
+import time
+from collections import OrderedDict
 from typing import Optional
 import asyncio
 
 import httpx
 import reflex as rx
 
+from app.backend import BACKEND_ORIGIN, get_client, invalidate_cached, user_key
+from app.state.bike_rows import clear_bike_rows
 from app.state.page_state import PageState
 
-# Talk directly to the FastAPI backend.
-# With the attached backend (Reflex running FastAPI on 8000),
-# this should point to :8000 by default.
-BACKEND_ORIGIN = os.getenv("BACKEND_ORIGIN", "http://127.0.0.1:9000")
+# Talk directly to the FastAPI backend (origin configured in app.backend).
 print("AuthState BACKEND_ORIGIN at startup:", BACKEND_ORIGIN)
 AUTH_PREFIX = "/auth"   # backend routes live under /auth/*
 
+# ---------- token validation cache ----------
+# /users/me results are kept per token (hashed, see user_key) for a short TTL so navigating between
+# protected pages doesn't cost a backend round trip each time. A revoked token
+# is still caught by the 401 handling in the data loaders (expire_session).
+ME_CACHE_TTL = float(os.getenv("AUTH_ME_CACHE_TTL", "60"))
+ME_CACHE_MAX = 2048
+EXP_LEEWAY = 5.0   # treat tokens this close to expiry as already expired
+
+_me_cache: "OrderedDict[str, tuple[float, dict]]" = OrderedDict()
+
+
+def jwt_exp(token: str) -> Optional[float]:
+    """Read the `exp` claim of a JWT without verifying it (the backend does that)."""
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        exp = jsonlib.loads(base64.urlsafe_b64decode(payload)).get("exp")
+        return float(exp) if exp is not None else None
+    except Exception:
+        return None
+
+
+def token_expired(token: str) -> bool:
+    exp = jwt_exp(token)
+    return exp is not None and exp - EXP_LEEWAY <= time.time()
+
+
+def cached_me(token: str) -> Optional[dict]:
+    """Cached /users/me payload for this token, or None if missing/stale."""
+    key = user_key(token)
+    entry = _me_cache.get(key)
+    if entry is None:
+        return None
+    valid_until, data = entry
+    if valid_until <= time.time():
+        _me_cache.pop(key, None)
+        return None
+    _me_cache.move_to_end(key)
+    return data
+
+
+def remember_me(token: str, data: dict):
+    valid_until = time.time() + ME_CACHE_TTL
+    exp = jwt_exp(token)
+    if exp is not None:
+        valid_until = min(valid_until, exp - EXP_LEEWAY)
+    key = user_key(token)
+    _me_cache[key] = (valid_until, data)
+    _me_cache.move_to_end(key)
+    while len(_me_cache) > ME_CACHE_MAX:
+        _me_cache.popitem(last=False)
+
+
+def forget_token(token: Optional[str]):
+    """Drop everything cached for this token (/users/me + backend responses)."""
+    if token:
+        _me_cache.pop(user_key(token), None)
+        invalidate_cached(token)
+
 
 class AuthState(rx.State):
     """Frontend-side auth state for Reflex, using JWTs via Authorization header.
@@ -78,28 +140,25 @@ class AuthState(rx.State):
             pool=10.,
         )
 
-        async with httpx.AsyncClient(
-            base_url=BACKEND_ORIGIN,
-            follow_redirects=True,
-            timeout=timeout,
-        ) as client:
-            url = f"{AUTH_PREFIX}{path}"  # e.g. "/auth/register"
-            try:
-                if method.upper() == "GET":
-                    r = await client.get(url, params=query, headers=headers)
-                else:
-                    r = await client.request(
-                        method.upper(),
-                        url,
-                        json=json,
-                        params=query,
-                        headers=headers,
-                    )
-            except httpx.ReadTimeout:
-                # unified shape: looks like a "response" with status 0
-                return 0, {"detail": "Backend timeout – please try again."}
-            except httpx.HTTPError as e:
-                return 0, {"detail": f"Error contacting backend: {e}"}
+        client = get_client()
+        url = f"{AUTH_PREFIX}{path}"  # e.g. "/auth/register"
+        try:
+            if method.upper() == "GET":
+                r = await client.get(url, params=query, headers=headers, timeout=timeout)
+            else:
+                r = await client.request(
+                    method.upper(),
+                    url,
+                    json=json,
+                    params=query,
+                    headers=headers,
+                    timeout=timeout,
+                )
+        except httpx.ReadTimeout:
+            # unified shape: looks like a "response" with status 0
+            return 0, {"detail": "Backend timeout – please try again."}
+        except httpx.HTTPError as e:
+            return 0, {"detail": f"Error contacting backend: {e}"}
 
         try:
             data = r.json()
@@ -166,6 +225,7 @@ class AuthState(rx.State):
         page.loading = True
 
         # clear auth state
+        forget_token(self.access_token)
         self.access_token = ""   # LocalStorage-backed, this also clears stored value
         self.refresh_token = ""
         self.me_email = None
@@ -175,7 +235,7 @@ class AuthState(rx.State):
         self.reset_form()
 
         # Use PageState.goto so you see loader while switching to /login
-        return page.goto("/login", "Logging you out…")
+        return [clear_bike_rows(), page.goto("/login", "Logging you out…")]
 
     async def register(self):
         """Register via backend /auth/register and prompt for email verification."""
@@ -248,26 +308,58 @@ class AuthState(rx.State):
             self.verify_success = False
             self.just_verified = False
 
-    async def refresh_me(self):
-        """Call /auth/users/me with Authorization header to get current user."""
+    def _apply_me(self, data: dict):
+        self.me_email = data.get("email")
+        self.me_role = data.get("role")
+        self.is_verified = (
+            data.get("is_active")
+            or data.get("verified")
+            or data.get("email_verified")
+        )
+
+    async def refresh_me(self, use_cache: bool = False):
+        """Call /auth/users/me with Authorization header to get current user.
+
+        With use_cache=True a recent result for the same token is reused
+        instead of hitting the backend.
+        """
+        token = self.access_token
+        if use_cache and token:
+            data = cached_me(token)
+            if data is not None:
+                self._apply_me(data)
+                return
+
         code, data = await self._fetch_json("GET", "/users/me", auth_required=True)
 
         if 200 <= code < 300 and isinstance(data, dict):
-            self.me_email = data.get("email")
-            self.me_role = data.get("role")
-            self.is_verified = (
-                data.get("is_active")
-                or data.get("verified")
-                or data.get("email_verified")
-            )
+            self._apply_me(data)
+            if token:
+                remember_me(token, data)
         else:
             if code == 401:
+                forget_token(token)
                 self.access_token = None
                 self.refresh_token = None
             self.me_email = None
             self.me_role = None
             self.is_verified = None
 
+    def expire_session(self):
+        """Drop a token the backend rejected (401) and send the user to /login.
+
+        Data loaders call this so a revoked token is caught even when the
+        guard was satisfied from the cache.
+        """
+        forget_token(self.access_token)
+        self.access_token = ""
+        self.refresh_token = None
+        self.me_email = None
+        self.me_role = None
+        self.is_verified = None
+        self.loading = False
+        return [clear_bike_rows(), rx.redirect("/login")]
+
     # async def ensure_auth_or_redirect(self):
     #     """Guard for protected pages using LocalStorage-backed access_token."""
     #     if not self.access_token:
@@ -296,8 +388,16 @@ class AuthState(rx.State):
             self.loading = False
             return rx.redirect("/login")
 
-        # Try to refresh /users/me with the current token
-        await self.refresh_me()
+        # Expired JWT → no need to ask the backend
+        if token_expired(self.access_token):
+            forget_token(self.access_token)
+            self.access_token = ""
+            self.refresh_token = None
+            self.loading = False
+            return rx.redirect("/login")
+
+        # Try to refresh /users/me with the current token (cached per token)
+        await self.refresh_me(use_cache=True)
 
         # If refresh failed (me_email not set), clear tokens & redirect
         if not self.me_email:
@@ -309,6 +409,63 @@ class AuthState(rx.State):
         # All good, user is authenticated
         self.loading = False
 
+    @rx.event(background=True)
+    async def ensure_auth_speculative(self, discard_states: list[str]):
+        """Auth guard that runs alongside the page's data loaders.
+
+        Being a background event, the frontend dispatches the next on_load
+        handlers straight away, so data requests overlap the /users/me check.
+        If the check fails, the states named in `discard_states` (full state
+        names) are reset so speculatively loaded data is thrown away.
+        Use via app.components.protected.protected_on_load.
+        """
+        async with self:
+            self.loading = True
+            token = self.access_token
+
+        me = None
+        if token and not token_expired(token):
+            me = cached_me(token)
+            if me is None:
+                code, data = await self._fetch_json("GET", "/users/me", auth_required=True)
+                if 200 <= code < 300 and isinstance(data, dict) and data.get("email"):
+                    me = data
+                    remember_me(token, data)
+
+        async with self:
+            if me is not None and self.access_token == token:
+                self._apply_me(me)
+                self.loading = False
+                return
+
+            forget_token(token)
+            self.access_token = ""
+            self.refresh_token = None
+            self.me_email = None
+            self.me_role = None
+            self.is_verified = None
+            await self._discard_states(discard_states)
+            self.loading = False
+        return [clear_bike_rows(), rx.redirect("/login")]
+
+    async def _discard_states(self, discard_states: list[str]):
+        for name in discard_states:
+            speculative = await self.get_state(rx.State.get_class_substate(name))
+            speculative.reset()
+
+    @rx.event
+    async def discard_if_signed_out(self, discard_states: list[str]):
+        """Runs after the page's loaders: throw their data away if auth already failed.
+
+        ensure_auth_speculative resets those states when its check fails, but
+        a loader can still be running at that point and write its results
+        afterwards; this catches that case. (If the check is still pending,
+        its own reset comes later.)
+        """
+        if not self.access_token:
+            await self._discard_states(discard_states)
+            return clear_bike_rows()
+
 
     # ---------- Forgot / reset password ----------
 
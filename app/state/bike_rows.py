@@ -0,0 +1,48 @@
+# app/state/bike_rows.py
+"""Rows of the /bikes list, held in browser state (a ClientStateVar).
+
+The backend sends each new page once (append_bike_rows) instead of
+resending the whole list. The value lives in a JS ref that survives page
+re-mounts and logout, so whoever ends a session clears it
+(clear_bike_rows); BikeState.reset() does not touch it.
+"""
+from typing import Dict, List
+
+import reflex as rx
+from reflex.experimental.client_state import ClientStateVar
+
+bike_rows = ClientStateVar.create("bike_rows", default=[])
+
+
+def set_bike_rows(rows: List[Dict]):
+    return bike_rows.push(rows)
+
+
+def append_bike_rows(rows: List[Dict]):
+    # the global ref holds the current value of bike_rows (see ClientStateVar)
+    current = "(refs['_client_state_bike_rows'] || [])"
+    return rx.call_script(f"{bike_rows.set}([...{current}, ...{rx.Var.create(rows)}])")
+
+
+def patch_bike_rows(old: List[Dict], new: List[Dict]):
+    """Turn the browser's rows from `old` into `new`, sending only rows that changed.
+
+    Rows are matched by id; unchanged ones are reused from the browser's
+    copy and only the id order travels for them.
+    """
+    before = {b.get("id"): b for b in old}
+    changed = [b for b in new if before.get(b.get("id")) != b]
+    order = [b.get("id") for b in new]
+    current = "(refs['_client_state_bike_rows'] || [])"
+    script = (
+        f"{bike_rows.set}(((rows, changed, order) => {{"
+        " const byId = new Map(rows.map((r) => [r.id, r]));"
+        " changed.forEach((r) => byId.set(r.id, r));"
+        " return order.map((id) => byId.get(id)).filter(Boolean);"
+        f" }})({current}, {rx.Var.create(changed)}, {rx.Var.create(order)}))"
+    )
+    return rx.call_script(script)
+
+
+def clear_bike_rows():
+    return bike_rows.push([])
@@ -1,15 +1,89 @@
 # app/state/bike_state.py
 # app/state/bike_state.py
-import base64
 import os
-import httpx
-import reflex as rx
-from typing import List, Dict
 
+import reflex as rx
+from typing import List, Dict, Optional
+
+from app.backend import (
+    get_client,
+    get_json,
+    invalidate_cached,
+    peek_json,
+    post_file,
+)
+from app.media import media_url, thumb_url
+from app.search import TrigramIndex, bike_fields, catalog_entries, catalog_index
 from app.state.auth_state import AuthState
+from app.state.bike_rows import append_bike_rows, patch_bike_rows, set_bike_rows
 from app.state.page_state import PageState
+from app.uploads import UploadTooLarge, discard, get_spooled, preview_url, spool_upload
+
+
+def with_hero_urls(data) -> List[Dict]:
+    """Fill hero_url / hero_thumb_url on each bike from hero_media_id.
+
+    Both point at our own media routes (see app.media): the full image goes
+    through the caching /_media proxy, list pages use /_thumbs.
+    """
+    data = data or []
+    for b in data:
+        hero_id = b.get("hero_media_id")
+        if hero_id and not b.get("hero_url"):
+            b["hero_url"] = media_url(hero_id)
+        if hero_id and not b.get("hero_thumb_url"):
+            b["hero_thumb_url"] = thumb_url(hero_id)
+        if b.get("hero_url") and not b.get("hero_thumb_url"):
+            b["hero_thumb_url"] = b["hero_url"]
+    return data
+
+
+# Bikes shown per page on /bikes; more load as the user scrolls.
+BIKES_PAGE_SIZE = int(os.getenv("BIKES_PAGE_SIZE", "24"))
+SEARCH_LIMIT = 10   # fuzzy hits shown per source (my bikes, catalog)
+
+
+def as_bikes_page(data) -> Dict:
+    """Normalize a GET /bikes response to {"items": [...], "next_cursor": ...}.
+
+    Accepts the paginated shape ({"items", "next_cursor"}) as well as a plain
+    list (backend ignored `limit`: whole garage, no cursor).
+    """
+    if isinstance(data, dict):
+        items, cursor = data.get("items") or [], data.get("next_cursor")
+    else:
+        items, cursor = data or [], None
+    return {"items": with_hero_urls(items), "next_cursor": cursor or None}
+
+
+def _bikes_page_params(cursor: Optional[str] = None) -> Dict:
+    params = {"limit": BIKES_PAGE_SIZE}
+    if cursor:
+        params["cursor"] = cursor
+    return params
 
-BACKEND_ORIGIN = os.getenv("BACKEND_ORIGIN", "http://127.0.0.1:9000")
+
+async def fetch_all_bikes(token: str) -> tuple[int, List[Dict]]:
+    """Every bike of the user, following next_cursor page by page.
+
+    Returns (status, bikes) like get_json. The first request uses the same
+    params and postprocess as BikeState.load_bikes, so the two share one
+    cache entry and coalesce when they run together.
+    """
+    bikes: List[Dict] = []
+    cursor = None
+    seen = set()
+    while True:
+        status, data = await get_json(
+            "/bikes", token, params=_bikes_page_params(cursor), postprocess=as_bikes_page
+        )
+        if status != 200:
+            return status, data
+        bikes.extend(data["items"])
+        cursor = data["next_cursor"]
+        if not cursor or cursor in seen:
+            return status, bikes
+        seen.add(cursor)
 
 
 class BikeState(rx.State):
@@ -19,63 +93,67 @@ class BikeState(rx.State):
     message: str = ""
     loading: bool = False
 
-    bikes: List[Dict] = []
+    # /bikes list: rows scrolled into view; the browser copy is bike_rows
+    _bikes: List[Dict] = []
+    _rows_sent: bool = False           # bike_rows replaced since this load began
+    bikes_shown: int = 0
     has_bikes: bool = False
+    has_more_bikes: bool = False
+    loading_more: bool = False
+    _bikes_cursor: str = ""            # next backend page
+    _bikes_buffer: List[Dict] = []     # fetched but not yet shown (unpaginated backend)
     current_bike: dict = {}
 
-    # ---- hero preview + cached upload payload ----
-    hero_preview_src: str = ""
+    # fuzzy search over loaded bikes + the catalog (app.search)
+    search_query: str = ""
+    _bike_trigrams: Optional[TrigramIndex] = None
+
+    # ---- hero preview + spooled upload (bytes live in app.uploads) ----
+    hero_preview_src: str = ""         # short-lived /_spool/{handle} URL
     hero_preview_error: str = ""
-    hero_upload_b64: str = ""          # raw bytes as base64 (NO data-url prefix)
-    hero_upload_filename: str = ""
-    hero_upload_content_type: str = ""
+    hero_upload_handle: str = ""       # opaque spool handle, NOT the bytes
+
+    # streamed while save_bike_background runs
+    save_progress: str = ""
+    upload_bytes_sent: int = 0
+    upload_bytes_total: int = 0
+
+    @rx.var
+    def upload_percent(self) -> int:
+        if not self.upload_bytes_total:
+            return 0
+        return int(100 * self.upload_bytes_sent / self.upload_bytes_total)
 
     @rx.event
     async def set_hero_preview(self, files: list[rx.UploadFile]):
-        """Read file once; build preview AND cache bytes for Save."""
-        self.hero_preview_error = ""
-        self.hero_preview_src = ""
-        self.hero_upload_b64 = ""
-        self.hero_upload_filename = ""
-        self.hero_upload_content_type = ""
+        """Spool the picked file to disk once; preview AND Save use the handle."""
+        self.clear_hero_preview()
 
         if not files:
             return
 
         f0 = files[0]
         try:
-            content = await f0.read()
-            if not content:
+            spooled = await spool_upload(f0)
+            if not spooled.size:
+                discard(spooled.handle)
                 self.hero_preview_error = "No file content received."
                 return
 
-            if len(content) > 5_000_000:
-                self.hero_preview_error = "Image too large to preview (max 5MB)."
-                return
-
-            filename = f0.filename or "image"
-            content_type = f0.content_type or "application/octet-stream"
-
-            b64 = base64.b64encode(content).decode("utf-8")
-
-            # cache for saving (so we don't re-read the file later)
-            self.hero_upload_b64 = b64
-            self.hero_upload_filename = filename
-            self.hero_upload_content_type = content_type
-
-            # data-url for preview
-            self.hero_preview_src = f"data:{content_type};base64,{b64}"
+            self.hero_upload_handle = spooled.handle
+            self.hero_preview_src = preview_url(spooled.handle)
 
+        except UploadTooLarge as e:
+            self.hero_preview_error = f"Image too large ({e})."
         except Exception as e:
             self.hero_preview_error = f"Preview failed: {e}"
 
     @rx.event
     def clear_hero_preview(self):
+        discard(self.hero_upload_handle)
         self.hero_preview_src = ""
         self.hero_preview_error = ""
-        self.hero_upload_b64 = ""
-        self.hero_upload_filename = ""
-        self.hero_upload_content_type = ""
+        self.hero_upload_handle = ""
 
     @rx.event
     def reset_new_bike_form(self):
@@ -84,83 +162,123 @@ class BikeState(rx.State):
         self.model_year = ""
         self.message = ""
         self.loading = False
+        self.save_progress = ""
+        self.upload_bytes_sent = 0
+        self.upload_bytes_total = 0
         self.clear_hero_preview()
 
+    def _new_bike_payload(self) -> dict:
+        """POST /bikes body from the form; raises ValueError on a bad year."""
+        payload = {"name": self.name, "brand": self.brand}
+        if self.model_year.strip():
+            payload["model_year"] = int(self.model_year.strip())
+        return payload
+
     @rx.event
     async def save_bike(self, files: list[rx.UploadFile]):
-        """Create bike, then upload hero image (prefer cached bytes), redirect."""
-        self.loading = True
+        """Validate the form and capture the hero bytes, then save in the background.
+
+        Upload handlers can't be background events, so this part stays short;
+        the backend calls happen in save_bike_background, which only holds
+        the state lock while writing progress/results.
+        """
         self.message = ""
 
         auth_state = await self.get_state(AuthState)
-        token = auth_state.access_token
-        if not token:
+        if not auth_state.access_token:
             self.loading = False
             self.message = "You must be logged in to add a bike."
             return rx.redirect("/login")
 
-        headers = {"Authorization": f"Bearer {token}"}
-        payload = {"name": self.name, "brand": self.brand}
+        try:
+            self._new_bike_payload()
+        except ValueError:
+            self.loading = False
+            self.message = "Model year must be a number."
+            return
 
-        if self.model_year.strip():
+        # Prefer the spooled preview file (prevents “empty file on save”).
+        if not get_spooled(self.hero_upload_handle) and files:
+            # fallback: no preview was generated, spool the file directly
             try:
-                payload["model_year"] = int(self.model_year.strip())
-            except ValueError:
+                spooled = await spool_upload(files[0])
+            except UploadTooLarge as e:
                 self.loading = False
-                self.message = "Model year must be a number."
+                self.message = f"Image too large ({e})."
                 return
+            self.hero_upload_handle = spooled.handle if spooled.size else ""
+
+        self.loading = True
+        self.save_progress = "Saving bike…"
+        return BikeState.save_bike_background
+
+    async def _save_failed(self, message: str):
+        async with self:
+            self.loading = False
+            self.save_progress = ""
+            self.upload_bytes_sent = 0
+            self.upload_bytes_total = 0
+            self.message = message
+
+    @rx.event(background=True)
+    async def save_bike_background(self):
+        """Create bike, then stream the spooled hero image to the backend, redirect."""
+        async with self:
+            auth_state = await self.get_state(AuthState)
+            token = auth_state.access_token
+            payload = self._new_bike_payload()
+            hero_handle = self.hero_upload_handle
+            self.save_progress = "Creating bike…"
+
+        headers = {"Authorization": f"Bearer {token}"}
 
         # 1) Create bike
         try:
-            async with httpx.AsyncClient(base_url=BACKEND_ORIGIN, timeout=20.0) as client:
-                r = await client.post("/bikes", json=payload, headers=headers)
+            client = get_client()
+            r = await client.post("/bikes", json=payload, headers=headers, timeout=20.0)
         except Exception as e:
-            self.loading = False
-            self.message = f"Error contacting backend: {e}"
-            return
+            return await self._save_failed(f"Error contacting backend: {e}")
 
         if not (200 <= r.status_code < 300):
             try:
                 detail = (r.json() or {}).get("detail")
             except Exception:
                 detail = None
-            self.loading = False
-            self.message = detail or f"Failed to add bike (status {r.status_code})"
-            return
+            return await self._save_failed(detail or f"Failed to add bike (status {r.status_code})")
 
         bike_data = r.json() or {}
         bike_id = bike_data.get("id")
         if not bike_id:
-            self.loading = False
-            self.message = "Bike created but response had no id."
-            return
+            return await self._save_failed("Bike created but response had no id.")
 
         # 2) Optional hero upload
-        # Prefer cached bytes from preview (prevents “empty file on save”).
-        should_upload = bool(self.hero_upload_b64) or bool(files)
+        spooled = get_spooled(hero_handle)
+        if hero_handle and spooled is None:
+            message = "Bike added, but the hero image expired before saving – please re-add it."
+        elif spooled is not None:
+            async def report(sent: int, total: int):
+                async with self:
+                    self.upload_bytes_sent = sent
+                    self.upload_bytes_total = total
+                    self.save_progress = (
+                        f"Uploading hero image… {sent / 1e6:.1f} / {total / 1e6:.1f} MB"
+                    )
 
-        if should_upload:
             try:
-                if self.hero_upload_b64:
-                    content = base64.b64decode(self.hero_upload_b64.encode("utf-8"))
-                    filename = self.hero_upload_filename or "image"
-                    content_type = self.hero_upload_content_type or "application/octet-stream"
-                else:
-                    # fallback: no preview was generated, use file directly
-                    f0 = files[0]
-                    content = await f0.read()
-                    filename = f0.filename or "image"
-                    content_type = f0.content_type or "application/octet-stream"
-
-                async with httpx.AsyncClient(base_url=BACKEND_ORIGIN, timeout=60.0) as client:
-                    resp = await client.post(
-                        f"/bikes/{bike_id}/media/hero",
-                        headers=headers,
-                        files={"file": (filename, content, content_type)},
-                    )
+                await report(0, spooled.size)
+                # chunked from disk: memory use doesn't grow with file size
+                resp = await post_file(
+                    f"/bikes/{bike_id}/media/hero",
+                    token,
+                    file_path=str(spooled.path),
+                    filename=spooled.filename,
+                    content_type=spooled.content_type,
+                    on_progress=report,
+                    timeout=60.0,
+                )
 
                 if not (200 <= resp.status_code < 300):
-                    self.message = f"Bike added, but hero image upload failed (status {resp.status_code})."
+                    message = f"Bike added, but hero image upload failed (status {resp.status_code})."
                 else:
                     warning = None
                     try:
@@ -168,27 +286,24 @@ class BikeState(rx.State):
                     except Exception:
                         warning = None
                     if warning:
-                        self.message = f"Bike added. {warning}"
+                        message = f"Bike added. {warning}"
                     else:
-                        self.message = "Bike and hero image added."
+                        message = "Bike and hero image added."
 
             except Exception as e:
-                self.message = f"Bike added, but image upload failed: {e}"
+                message = f"Bike added, but image upload failed: {e}"
         else:
-            self.message = "Bike added."
+            message = "Bike added."
 
-        self.loading = False
+        # cached list is stale now; /bikes refetches on next visit
+        invalidate_cached(token, "/bikes")
 
-        # optional refresh list
-        try:
-            await self.load_bikes()
-        except Exception:
-            pass
-
-        # clean up form so next open is fresh
-        self.reset_new_bike_form()
-        return await self.goto_bike(bike_id)
-        # return rx.redirect(f"/bike_analyser/{bike_id}")
+        async with self:
+            self.message = message
+            # clean up form so next open is fresh
+            self.reset_new_bike_form()
+            event = await self.goto_bike(bike_id)
+        return event
 
     @rx.event
     async def submit_bike(self):
@@ -199,45 +314,170 @@ class BikeState(rx.State):
     # ----------------------------
     @rx.event
     async def load_bikes(self):
-        self.loading = True
+        """Stale-while-revalidate on the first page: show the last known one, then refresh."""
         self.message = ""
 
         auth_state = await self.get_state(AuthState)
         token = auth_state.access_token
         if not token:
             self.loading = False
-            return rx.redirect("/login")
-
-        headers = {"Authorization": f"Bearer {token}"}
+            yield rx.redirect("/login")
+            return
 
+        # The page (re)mounted: whatever the browser still holds (possibly
+        # another session's rows) is replaced by this load's first page.
+        self._rows_sent = False
+        stale = peek_json("/bikes", token, params=_bikes_page_params(), postprocess=as_bikes_page)
+        if stale is not None:
+            self.loading = False
+            yield self._set_first_page(stale)   # cached page before revalidating
+        else:
+            self.loading = True
+
+        event = await self._refresh_bikes(auth_state)
+        if event is not None:
+            yield event
+
+    def _set_first_page(self, page: Dict):
+        """Show `page` as the list; returns the event replacing the browser's rows, if changed."""
+        items = page["items"]
+        shown, self._bikes_buffer = items[:BIKES_PAGE_SIZE], items[BIKES_PAGE_SIZE:]
+        self._bikes_cursor = page["next_cursor"] or ""
+        self.has_more_bikes = bool(self._bikes_buffer or self._bikes_cursor)
+        self.bikes_shown = len(shown)
+        self.has_bikes = len(shown) > 0
+        # A fresh load replaces the browser's rows; a revalidation sends only
+        # the rows that differ (nothing at all when the page is unchanged).
+        if not self._rows_sent:
+            event = set_bike_rows(shown)
+        elif self._bikes != shown:
+            event = patch_bike_rows(self._bikes, shown)
+        else:
+            event = None
+        self._bikes = shown
+        self._rows_sent = True
+        self._index_bikes()
+        return event
+
+    async def _refresh_bikes(self, auth_state: AuthState):
+        """GET the first /bikes page and apply it; returns the event to send (redirect on 401)."""
         try:
-            async with httpx.AsyncClient(base_url=BACKEND_ORIGIN, timeout=20.0) as client:
-                r = await client.get("/bikes", headers=headers)
+            # conditional GET: a 304 hands back the already-patched page
+            status, data = await get_json(
+                "/bikes",
+                auth_state.access_token,
+                params=_bikes_page_params(),
+                postprocess=as_bikes_page,
+                timeout=20.0,
+            )
         except Exception as e:
             self.loading = False
             self.message = f"Error contacting backend: {e}"
-            return
+            if self._rows_sent:
+                return None   # keep the stale page already shown
+            return self._set_first_page({"items": [], "next_cursor": None})
 
         self.loading = False
 
-        if 200 <= r.status_code < 300:
-            data = r.json() or []
-            for b in data:
-                hero_id = b.get("hero_media_id")
-                if hero_id and not b.get("hero_url"):
-                    b["hero_url"] = f"{BACKEND_ORIGIN}/media/{hero_id}"
-                if b.get("hero_url") and not b.get("hero_thumb_url"):
-                    b["hero_thumb_url"] = b["hero_url"]
-            self.bikes = data
-            self.has_bikes = len(data) > 0
-        else:
+        if status == 401:
+            return auth_state.expire_session()
+
+        if 200 <= status < 300:
+            return self._set_first_page(data)
+        detail = data.get("detail") if isinstance(data, dict) else None
+        self.message = detail or f"Failed to load bikes (status {status})"
+        return self._set_first_page({"items": [], "next_cursor": None})
+
+    @rx.event
+    async def load_more_bikes(self):
+        """Append the next page (infinite scroll on /bikes)."""
+        if self.loading_more or not self.has_more_bikes:
+            return
+
+        if not self._bikes_buffer:
+            auth_state = await self.get_state(AuthState)
+            self.loading_more = True
+            yield
             try:
-                detail = (r.json() or {}).get("detail")
-            except Exception:
-                detail = None
-            self.message = detail or f"Failed to load bikes (status {r.status_code})"
-            self.bikes = []
-            self.has_bikes = False
+                status, data = await get_json(
+                    "/bikes",
+                    auth_state.access_token,
+                    params=_bikes_page_params(self._bikes_cursor),
+                    postprocess=as_bikes_page,
+                    timeout=20.0,
+                )
+            except Exception as e:
+                self.loading_more = False
+                self.message = f"Error contacting backend: {e}"
+                return
+            self.loading_more = False
+
+            if status == 401:
+                yield auth_state.expire_session()
+                return
+            if not (200 <= status < 300):
+                detail = data.get("detail") if isinstance(data, dict) else None
+                self.message = detail or f"Failed to load more bikes (status {status})"
+                return
+            self._bikes_buffer = data["items"]
+            self._bikes_cursor = data["next_cursor"] or ""
+
+        page, self._bikes_buffer = (
+            self._bikes_buffer[:BIKES_PAGE_SIZE],
+            self._bikes_buffer[BIKES_PAGE_SIZE:],
+        )
+        self._bikes = [*self._bikes, *page]
+        self.bikes_shown = len(self._bikes)
+        self.has_bikes = len(self._bikes) > 0
+        self.has_more_bikes = bool(self._bikes_buffer or self._bikes_cursor)
+        self._index_bikes()
+        yield append_bike_rows(page)   # only the new rows go to the browser
+
+    # ----------------------------
+    # Search (typo-tolerant)
+    # ----------------------------
+    def _index_bikes(self):
+        """Bring the trigram index in line with the loaded bikes (adds / removals only)."""
+        index = self._bike_trigrams or TrigramIndex()
+        index.sync({
+            str(b["id"]): bike_fields(b)
+            for b in [*self._bikes, *self._bikes_buffer] if b.get("id")
+        })
+        self._bike_trigrams = index   # reassign so search_results recomputes
+
+    @rx.event
+    def set_search_query(self, value: str):
+        self.search_query = value
+
+    @rx.var
+    def search_results(self) -> List[Dict[str, str]]:
+        """Ranked fuzzy matches: loaded bikes first, then catalog entries."""
+        query = self.search_query.strip()
+        if not query:
+            return []
+        results = []
+        if self._bike_trigrams is not None:
+            by_id = {str(b["id"]): b for b in [*self._bikes, *self._bikes_buffer] if b.get("id")}
+            for bike_id, _ in self._bike_trigrams.search(query, SEARCH_LIMIT):
+                b = by_id.get(bike_id)
+                if b is not None:
+                    results.append({
+                        "kind": "bike",
+                        "id": bike_id,
+                        "title": f"{b.get('brand') or ''} {b.get('name') or 'Untitled'}".strip(),
+                        "detail": str(b.get("model_year") or ""),
+                    })
+        catalog = catalog_entries()
+        for cid, _ in catalog_index().search(query, SEARCH_LIMIT):
+            e = catalog[cid]
+            years = "–".join(str(y) for y in (e.get("model_year_start"), e.get("model_year_end")) if y)
+            results.append({
+                "kind": "catalog",
+                "id": cid,
+                "title": f"{e.get('brand') or ''} {e.get('model') or ''}".strip(),
+                "detail": " · ".join(x for x in ("Catalog", e.get("category") or "", years) if x),
+            })
+        return results
 
     # ----------------------------
     # Single bike (analyser)
@@ -266,14 +506,17 @@ class BikeState(rx.State):
         headers = {"Authorization": f"Bearer {token}"}
 
         try:
-            async with httpx.AsyncClient(base_url=BACKEND_ORIGIN, timeout=20.0) as client:
-                r = await client.get(f"/bikes/{bike_id}", headers=headers)
+            client = get_client()
+            r = await client.get(f"/bikes/{bike_id}", headers=headers, timeout=20.0)
         except Exception as e:
             self.loading = False
             self.message = f"Error contacting backend in load_one_bike: {e}"
             return
 
         self.loading = False
+        if r.status_code == 401:
+            return auth.expire_session()
+
         data = None
         try:
             data = r.json()
@@ -281,12 +524,7 @@ class BikeState(rx.State):
             pass
 
         if r.status_code == 200 and isinstance(data, dict):
-            hero_id = data.get("hero_media_id")
-            if hero_id and not data.get("hero_url"):
-                data["hero_url"] = f"{BACKEND_ORIGIN}/media/{hero_id}"
-            if data.get("hero_url") and not data.get("hero_thumb_url"):
-                data["hero_thumb_url"] = data["hero_url"]
-            self.current_bike = data
+            self.current_bike = with_hero_urls([data])[0]
         else:
             detail = data.get("detail") if isinstance(data, dict) else None
             self.message = detail or f"Failed to load bike (status {r.status_code})"
@@ -328,8 +566,8 @@ class BikeState(rx.State):
         headers = {"Authorization": f"Bearer {token}"}
 
         try:
-            async with httpx.AsyncClient(base_url=BACKEND_ORIGIN, timeout=20.0) as client:
-                r = await client.delete(f"/bikes/{bike_id}", headers=headers)
+            client = get_client()
+            r = await client.delete(f"/bikes/{bike_id}", headers=headers, timeout=20.0)
         except Exception as e:
             self.message = f"Delete failed: {e}"
             return
@@ -338,8 +576,9 @@ class BikeState(rx.State):
             self.message = f"Delete failed ({r.status_code}): {r.text}"
             return
 
-        await self.load_bikes()
+        invalidate_cached(token, "/bikes")
         self.message = "Bike deleted."
+        return await self._refresh_bikes(auth_state)
 
     # ----------------------------
     # Viewer init (unchanged)
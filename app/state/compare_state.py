@@ -0,0 +1,149 @@
+# app/state/compare_state.py
+import asyncio
+import math
+import os
+import weakref
+from array import array
+from typing import Dict, List, Optional
+
+import httpx
+import reflex as rx
+
+from app.state.auth_state import AuthState
+from app.state.kinematics_state import fetch_kinematics
+
+# Solver fetches a single tab may have in flight while building a comparison.
+COMPARE_MAX_IN_FLIGHT = int(os.getenv("COMPARE_MAX_IN_FLIGHT", "3"))
+COMPARE_MAX_BIKES = 6
+# Shared travel grid (mm) every curve is resampled onto.
+GRID_STEP_MM = 2.0
+# Resampled curves kept per tab, including bikes since removed.
+CURVE_CACHE_MAX = 16
+
+PALETTE = ["#00A0E6", "#fb5527", "#2ca02c", "#9467bd", "#e6a700", "#4a4a4a"]
+
+# One semaphore per tab, alive only while that tab has fetches running.
+_slots: "weakref.WeakValueDictionary[str, asyncio.Semaphore]" = weakref.WeakValueDictionary()
+
+
+def _slot(client_token: str) -> asyncio.Semaphore:
+    sem = _slots.get(client_token)
+    if sem is None:
+        sem = asyncio.Semaphore(COMPARE_MAX_IN_FLIGHT)
+        _slots[client_token] = sem
+    return sem
+
+
+class CompareState(rx.State):
+    """Leverage curves of several bikes on one shared travel grid."""
+
+    # [{"id", "name", "color"}] in the order they were added
+    compare_bikes: List[Dict[str, str]] = []
+    loading_ids: List[str] = []
+    compare_errors: Dict[str, str] = {}
+    # panel-level message (e.g. comparison full), not tied to a compared bike
+    compare_notice: str = ""
+
+    # bike id -> leverage at travel 0, GRID_STEP_MM, ... (backend-only, kept
+    # after removal so re-adding a bike costs nothing)
+    _curves: Dict[str, array] = {}
+
+    def _is_compared(self, bike_id: str) -> bool:
+        return any(b["id"] == bike_id for b in self.compare_bikes)
+
+    @rx.event(background=True)
+    async def toggle_compare(self, bike_id: str, name: str):
+        """Add a bike to the comparison (fetching only its curve) or remove it."""
+        async with self:
+            self.compare_notice = ""
+            if self._is_compared(bike_id):
+                self.compare_bikes = [b for b in self.compare_bikes if b["id"] != bike_id]
+                self.compare_errors.pop(bike_id, None)
+                return
+            if len(self.compare_bikes) >= COMPARE_MAX_BIKES:
+                self.compare_notice = f"Compare at most {COMPARE_MAX_BIKES} bikes."
+                return
+            used = {b["color"] for b in self.compare_bikes}
+            color = next((c for c in PALETTE if c not in used), PALETTE[0])
+            self.compare_bikes = [*self.compare_bikes, {"id": bike_id, "name": name or "Untitled", "color": color}]
+            self.compare_errors.pop(bike_id, None)
+            if bike_id in self._curves:
+                return
+            self.loading_ids = [*self.loading_ids, bike_id]
+            auth = await self.get_state(AuthState)
+            token = auth.access_token
+            client_token = self.router.session.client_token
+
+        sem = _slot(client_token)
+        error = None
+        curve = None
+        try:
+            async with sem:
+                steps, _ = await fetch_kinematics(bike_id, token)
+            curve = steps.index().leverage_on_grid(GRID_STEP_MM)
+            if not curve:
+                error = "No kinematics for this bike yet."
+        except httpx.HTTPStatusError as exc:
+            error = f"HTTP {exc.response.status_code}"
+        except Exception as exc:
+            error = str(exc)
+
+        async with self:
+            self.loading_ids = [i for i in self.loading_ids if i != bike_id]
+            if error:
+                self.compare_errors[bike_id] = error
+                return
+            self._curves[bike_id] = curve
+            self._trim_curves()
+
+    def _trim_curves(self):
+        if len(self._curves) <= CURVE_CACHE_MAX:
+            return
+        active = {b["id"] for b in self.compare_bikes}
+        for bike_id in [k for k in self._curves if k not in active]:
+            del self._curves[bike_id]
+            if len(self._curves) <= CURVE_CACHE_MAX:
+                break
+
+    @rx.event
+    def clear_compare(self):
+        self.compare_bikes = []
+        self.compare_errors = {}
+        self.compare_notice = ""
+
+    @rx.var
+    def compare_series(self) -> List[Dict[str, str]]:
+        """Compared bikes whose curve is ready (one chart line each)."""
+        return [b for b in self.compare_bikes if b["id"] in self._curves]
+
+    @rx.var
+    def compare_rows(self) -> List[Dict[str, str]]:
+        """Compared bikes with a status for the legend list."""
+        rows = []
+        for b in self.compare_bikes:
+            if b["id"] in self.loading_ids:
+                status = "loading…"
+            else:
+                status = self.compare_errors.get(b["id"], "")
+            rows.append({**b, "status": status})
+        return rows
+
+    @rx.var
+    def compared_ids(self) -> List[str]:
+        return [b["id"] for b in self.compare_bikes]
+
+    @rx.var
+    def compare_chart(self) -> List[Dict[str, Optional[float]]]:
+        """Rows {"travel": mm, <bike id>: leverage, ...} on the shared grid."""
+        curves = [(b["id"], self._curves[b["id"]]) for b in self.compare_bikes if b["id"] in self._curves]
+        if not curves:
+            return []
+        n = max(len(c) for _, c in curves)
+        rows = []
+        for i in range(n):
+            row: Dict[str, Optional[float]] = {"travel": round(i * GRID_STEP_MM, 1)}
+            for bike_id, c in curves:
+                v = c[i] if i < len(c) else math.nan
+                row[bike_id] = round(v, 3) if math.isfinite(v) else None
+            rows.append(row)
+        return rows
@@ -1,58 +1,378 @@
 # app/state/kinematics_state.py
+import asyncio
+import json
+import math
 import os
-import httpx
+import time
+from collections import OrderedDict
+
 import reflex as rx
-from typing import Any, Dict, List, Optional
+from typing import Dict, Optional
+
+import httpx
+
+from app.backend import get_json, iter_ndjson
+from app.kinematics import StepColumns, geometry_fingerprint
+from app.metrics import wheel_rate
+
+# Solver results per geometry fingerprint, shared by all sessions in the
+# process: re-running an unchanged bike returns at once.
+KINEMATICS_CACHE_MAX = int(os.getenv("KINEMATICS_CACHE_MAX", "128"))
+
+# Streamed steps are pushed to the UI in batches of this many, or at least
+# every STEP_FLUSH_INTERVAL seconds while data is arriving.
+STEP_BATCH = 64
+STEP_FLUSH_INTERVAL = 0.25
+# Minimum seconds between focus-triggered geometry checks
+GEOMETRY_CHECK_INTERVAL = 10.0
+
+# In-flight solver run per browser tab (client token), so a new run or
+# leaving the page can cancel it – which also closes the backend stream.
+_solver_tasks: dict[str, asyncio.Task] = {}
+
+
+class SolverSuperseded(Exception):
+    """A newer run (or a cancel) replaced this one; drop its results."""
+
+
+def cancel_solver_task(client_token: str):
+    task = _solver_tasks.pop(client_token, None)
+    if task is not None and task is not asyncio.current_task() and not task.done():
+        task.cancel()
+
+
+_result_cache: "OrderedDict[str, tuple[StepColumns, Optional[str]]]" = OrderedDict()
+
+
+def cached_result(fingerprint: str) -> Optional[tuple[StepColumns, Optional[str]]]:
+    """(steps, rear_axle_point_id) solved for this geometry, or None."""
+    entry = _result_cache.get(fingerprint)
+    if entry is not None:
+        _result_cache.move_to_end(fingerprint)
+    return entry
 
-BACKEND_ORIGIN = os.getenv("BACKEND_ORIGIN", "http://127.0.0.1:9000")
+
+def remember_result(fingerprint: str, steps: StepColumns, rear_axle_point_id: Optional[str]):
+    _result_cache[fingerprint] = (steps, rear_axle_point_id)
+    _result_cache.move_to_end(fingerprint)
+    while len(_result_cache) > KINEMATICS_CACHE_MAX:
+        _result_cache.popitem(last=False)
+
+
+async def iter_solver_steps(bike_id: str, access_token: str, solver_options: Optional[dict] = None):
+    """Yield (steps, rear_axle_point_id) per object of the kinematics stream.
+
+    Lines are either single steps or {"steps": [...]} objects (also what a
+    non-streaming backend returns); rear_axle_point_id is None when a line
+    doesn't carry it. An {"error": ...} line raises RuntimeError.
+    """
+    url = f"/bikes/{bike_id}/kinematics"
+    async for obj in iter_ndjson(url, access_token, params=solver_options or None):
+        if not isinstance(obj, dict):
+            continue
+        if obj.get("error"):
+            raise RuntimeError(obj["error"])
+        if isinstance(obj.get("steps"), list):
+            steps = obj["steps"]          # whole / partial result object
+        elif "step_index" in obj or "shock_stroke" in obj:
+            steps = [obj]                 # one step per line
+        else:
+            steps = []
+        yield steps, obj.get("rear_axle_point_id")
+
+
+async def fetch_kinematics(
+    bike_id: str,
+    access_token: str,
+    solver_options: Optional[dict] = None,
+    fingerprint: Optional[str] = None,
+) -> tuple[StepColumns, Optional[str]]:
+    """Whole solver result for a bike, from the fingerprint cache when possible.
+
+    For callers that don't stream into the UI (e.g. comparisons). Pass
+    `fingerprint` if it was just read, to skip reading it again.
+    """
+    if fingerprint is None:
+        try:
+            fingerprint = await fetch_fingerprint(bike_id, access_token, solver_options)
+        except Exception:
+            fingerprint = None
+    hit = cached_result(fingerprint) if fingerprint else None
+    if hit is not None:
+        return hit
+
+    steps = StepColumns()
+    rear_axle_point_id = None
+    async for batch, rear_id in iter_solver_steps(bike_id, access_token, solver_options):
+        steps.extend(batch)
+        rear_axle_point_id = rear_id or rear_axle_point_id
+    if fingerprint:
+        remember_result(fingerprint, steps, rear_axle_point_id)
+    return steps, rear_axle_point_id
+
+
+async def fetch_fingerprint(
+    bike_id: str, access_token: str, solver_options: Optional[dict] = None
+) -> Optional[str]:
+    """Fingerprint of the bike's saved points, bodies and scale; None if they can't be read.
+
+    The viewer saves geometry straight to the backend, so it is re-read here
+    (conditional GETs, usually a 304) rather than trusted from state.
+    """
+    (bike_status, bike), (bodies_status, bodies) = await asyncio.gather(
+        get_json(f"/bikes/{bike_id}", access_token, timeout=10.0),
+        get_json(f"/bikes/{bike_id}/bodies", access_token, timeout=10.0),
+    )
+    if bike_status != 200 or bodies_status != 200:
+        return None
+    return geometry_fingerprint(
+        (bike or {}).get("points") or [],
+        (bodies or {}).get("bodies") or [],
+        (bike or {}).get("geometry") or {},
+        solver_options,
+    )
 
 
 class KinematicsState(rx.State):
-    # Core solver data
-    solver_steps: List[Dict[str, Any]] = []
+    # Core solver data: columnar, backend-only (the table gets step_table_rows)
+    _steps: StepColumns = StepColumns()
     rear_axle_point_id: Optional[str] = None
     has_result: bool = False
 
+    # geometry hash the shown result was solved for / latest saved geometry
+    result_fingerprint: str = ""
+    geometry_fingerprint: str = ""
+    # when check_geometry last ran (time.monotonic), for recheck_geometry
+    _geometry_checked_at: float = 0.0
+
+    # coil spring rate (N/mm) for wheel-rate curves; 0 = not set
+    spring_rate: float = 0.0
+    # operating point shown in the panel
+    sag_percent: float = 30.0
+
+    # rows streamed since the run started, for /js/step_table.js to append:
+    # {"base": rows before this batch, "rows": [...]}; "" outside a stream
+    step_rows_append: str = ""
+
     # UX
     error: Optional[str] = None
     is_loading: bool = False
+    progress: str = ""
     selected_step: int = 0
 
-    @rx.event
+    # bumped by every run / cancel; older runs must not touch state
+    _run_generation: int = 0
+
+    @rx.event(background=True)
     async def load_kinematics(self, bike_id: str, access_token: str):
+        """Run the solver via the backend without holding the state lock.
+
+        Background event: other clicks in the tab keep working while the
+        solver runs. The response is consumed as NDJSON (one step per line)
+        and each batch goes to the table as new rows only (step_rows_append),
+        so it fills in progressively; _steps and the vars derived from it
+        are set once, when the stream ends. There is no overall timeout
+        while data keeps arriving. If the saved geometry was solved before, the cached
+        result is used instead.
+
+        Starting a run cancels the tab's previous one; a superseded run
+        never writes its results.
+        """
         if not bike_id:
             return
         if not access_token:
-            self.error = "No access token"
+            async with self:
+                self.error = "No access token"
             return
 
-        self.error = None
-        self.is_loading = True
-        self.solver_steps = []
-        self.rear_axle_point_id = None
-        self.has_result = False
+        async with self:
+            self._run_generation += 1
+            generation = self._run_generation
+            client_token = self.router.session.client_token
+            self.error = None
+            self.is_loading = True
+            self.progress = "Running solver…"
+            self._steps = StepColumns()
+            self.step_rows_append = json.dumps({"base": 0, "rows": []})
+            self.rear_axle_point_id = None
+            self.has_result = False
+            self.result_fingerprint = ""
 
-        url = f"{BACKEND_ORIGIN}/bikes/{bike_id}/kinematics"
-        headers = { "Authorization": f"Bearer {access_token}" }
+        cancel_solver_task(client_token)
+        _solver_tasks[client_token] = asyncio.current_task()
 
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                resp = await client.get(url, headers=headers)
+            try:
+                fingerprint = await fetch_fingerprint(bike_id, access_token)
+            except Exception:
+                fingerprint = None  # no cache this time, still solve
 
-            if resp.status_code != 200:
-                self.error = f"HTTP {resp.status_code}: {resp.text}"
+            hit = cached_result(fingerprint) if fingerprint else None
+            if hit is not None:
+                async with self:
+                    self._check_current(generation)
+                    self._apply_result(*hit, fingerprint)
                 return
 
-            data = resp.json()
-            self.solver_steps = data.get("steps", [])
-            self.rear_axle_point_id = data.get("rear_axle_point_id")
-            self.has_result = len(self.solver_steps) > 0
+            steps = StepColumns()
+            rear_axle_point_id = None
+            pending: list[dict] = []
+            last_flush = time.monotonic()
+
+            async def flush():
+                nonlocal last_flush
+                base = len(steps)
+                steps.extend(pending)
+                # new rows only; derived columns are filled in when the run ends
+                rows = [[*r, None, None] for r in StepColumns.from_steps(pending).rows(ndigits=4)]
+                async with self:
+                    self._check_current(generation)
+                    self.step_rows_append = json.dumps({"base": base, "rows": rows}, separators=(",", ":"))
+                    if not self.has_result and len(steps) > 0:
+                        self.has_result = True
+                    self.progress = f"Receiving steps… {len(steps)}"
+                pending.clear()
+                last_flush = time.monotonic()
+
+            async for batch, rear_id in iter_solver_steps(bike_id, access_token):
+                pending.extend(batch)
+                rear_axle_point_id = rear_id or rear_axle_point_id
+                if len(pending) >= STEP_BATCH or time.monotonic() - last_flush >= STEP_FLUSH_INTERVAL:
+                    await flush()
+            if pending:
+                await flush()
+
+            if fingerprint:
+                remember_result(fingerprint, steps, rear_axle_point_id)
+            async with self:
+                self._check_current(generation)
+                self._apply_result(steps, rear_axle_point_id, fingerprint or "")
+
+        except (asyncio.CancelledError, SolverSuperseded):
+            pass  # replaced by a newer run or cancelled; leave state alone
+
+        except httpx.HTTPStatusError as exc:
+            async with self:
+                if self._run_generation == generation:
+                    self.error = f"HTTP {exc.response.status_code}: {exc.response.text}"
 
         except Exception as exc:
-            self.error = str(exc)
+            async with self:
+                if self._run_generation == generation:
+                    self.error = str(exc)
 
         finally:
+            if _solver_tasks.get(client_token) is asyncio.current_task():
+                del _solver_tasks[client_token]
+            async with self:
+                if self._run_generation == generation:
+                    self.is_loading = False
+                    self.progress = ""
+
+    def _check_current(self, generation: int):
+        if self._run_generation != generation:
+            raise SolverSuperseded()
+
+    @rx.event
+    def cancel_solver(self):
+        """Abort the tab's running solve (Cancel button, leaving the analyser)."""
+        self._run_generation += 1
+        cancel_solver_task(self.router.session.client_token)
+        if self.is_loading:
             self.is_loading = False
+            self.progress = ""
+
+    def _apply_result(self, steps: StepColumns, rear_axle_point_id: Optional[str], fingerprint: str):
+        self._steps = steps
+        self.step_rows_append = ""   # the table switches to step_table_rows
+        self.rear_axle_point_id = rear_axle_point_id
+        self.has_result = len(steps) > 0
+        self.result_fingerprint = fingerprint
+        self.geometry_fingerprint = fingerprint
+
+    @rx.event(background=True)
+    async def check_geometry(self, bike_id: str, access_token: str):
+        """Re-read the saved geometry so the panel can flag a stale result."""
+        if not bike_id or not access_token:
+            return
+        async with self:
+            if not self.has_result or self.is_loading:
+                return
+            self._geometry_checked_at = time.monotonic()
+        try:
+            fingerprint = await fetch_fingerprint(bike_id, access_token)
+        except Exception:
+            return
+        if fingerprint:
+            async with self:
+                self.geometry_fingerprint = fingerprint
+
+    @rx.event
+    def recheck_geometry(self, bike_id: str, access_token: str):
+        """check_geometry, at most once per GEOMETRY_CHECK_INTERVAL."""
+        if time.monotonic() - self._geometry_checked_at < GEOMETRY_CHECK_INTERVAL:
+            return
+        return KinematicsState.check_geometry(bike_id, access_token)
+
+    @rx.var
+    def result_is_current(self) -> bool:
+        return bool(self.result_fingerprint) and self.result_fingerprint == self.geometry_fingerprint
+
+    @rx.var
+    def result_fingerprint_short(self) -> str:
+        return self.result_fingerprint[:8]
+
+    @rx.event
+    def set_spring_rate(self, value: str):
+        try:
+            self.spring_rate = max(0.0, float(value)) if value.strip() else 0.0
+        except ValueError:
+            pass
+
+    @rx.event
+    def set_sag_percent(self, value: str):
+        try:
+            self.sag_percent = min(100.0, max(0.0, float(value)))
+        except ValueError:
+            pass
+
+    @rx.var
+    def sag_point(self) -> Dict[str, Optional[float]]:
+        """Stroke / travel / leverage (and wheel rate) at sag_percent, from the step index."""
+        if not self.has_result:
+            return {}
+        point = self._steps.index().sag_point(self.sag_percent)
+        point["wheel_rate"] = wheel_rate(self.spring_rate, point["leverage"])
+        return {k: (round(v, 2) if math.isfinite(v) else None) for k, v in point.items()}
+
+    @rx.var
+    def metrics_summary(self) -> Dict[str, Optional[float]]:
+        """Scalar suspension metrics (see app.metrics); recomputed only with new steps."""
+        m = self._steps.metrics()
+        if m is None:
+            return {}
+        values = {
+            "start_leverage": m.start_leverage,
+            "end_leverage": m.end_leverage,
+            "mean_leverage": m.mean_leverage,
+            "progression_pct": m.progression_pct,
+            "travel_mm": m.travel_mm,
+            "stroke_mm": m.stroke_mm,
+            "start_wheel_rate": wheel_rate(self.spring_rate, m.start_leverage),
+            "end_wheel_rate": wheel_rate(self.spring_rate, m.end_leverage),
+        }
+        return {k: (round(v, 2) if math.isfinite(v) else None) for k, v in values.items()}
+
+    @rx.var
+    def step_table_rows(self) -> str:
+        """Compact JSON rows for /js/step_table.js:
+        [step, stroke, travel, leverage, d(leverage)/d(travel), wheel rate]."""
+        m = self._steps.metrics()
+        if m is None:
+            return "[]"
+        rates = [wheel_rate(self.spring_rate, lr) for lr in self._steps.leverage_ratio]
+        rows = self._steps.rows(ndigits=4, extra=(m.leverage_slope, rates))
+        return json.dumps(rows, separators=(",", ":"))
 
     @rx.event
     def set_step(self, step: int):
@@ -0,0 +1,181 @@
+# app/state/shed_solve_state.py
+import asyncio
+import math
+import os
+from typing import Dict, Tuple
+
+import httpx
+import reflex as rx
+
+from app.kinematics import StepColumns
+from app.state.auth_state import AuthState
+from app.state.kinematics_state import SolverSuperseded, fetch_fingerprint, fetch_kinematics
+from app.state.shed_state import ShedState
+
+# Solver requests one "solve all" job keeps in flight; a 30-bike shed
+# queues behind this many workers instead of hitting the backend at once.
+SHED_SOLVE_WORKERS = int(os.getenv("SHED_SOLVE_WORKERS", "3"))
+SHED_CACHE_MAX = 8   # sheds whose results a tab keeps
+
+# Running job per browser tab (client token), so it can be cancelled.
+_solve_jobs: dict[str, asyncio.Task] = {}
+
+
+def _summary(steps: StepColumns) -> str:
+    m = steps.metrics()
+    if m is None or not math.isfinite(m.start_leverage):
+        return "no steps"
+    return (
+        f"LR {m.start_leverage:.2f}→{m.end_leverage:.2f} · "
+        f"{m.progression_pct:.0f}% prog. · {m.travel_mm:.0f} mm"
+    )
+
+
+class ShedSolveState(rx.State):
+    """Batch solver runs ("solve all") for the bikes of the shed being viewed."""
+
+    # per bike id: "queued" | "solving" | "done" | "error: …"
+    bike_status: Dict[str, str] = {}
+    # per bike id: one-line metrics of the solved result
+    bike_summary: Dict[str, str] = {}
+    solving: bool = False
+    solved_count: int = 0
+    failed_count: int = 0
+    total_count: int = 0
+
+    # shed the statuses above belong to
+    _shed_id: str = ""
+    # shed id -> bike id -> (geometry fingerprint, result); backend-only
+    _results: Dict[str, Dict[str, Tuple[str, StepColumns]]] = {}
+    _job_generation: int = 0
+
+    def _cancel_job(self):
+        self._job_generation += 1
+        task = _solve_jobs.pop(self.router.session.client_token, None)
+        if task is not None and not task.done():
+            task.cancel()
+        self.solving = False
+
+    def _reset_statuses(self, shed_id: str):
+        self._shed_id = shed_id
+        self.bike_status = {}
+        self.bike_summary = {}
+        self.solved_count = 0
+        self.failed_count = 0
+        self.total_count = 0
+
+    @rx.event
+    def sync_shed(self):
+        """on_load of /sheds/[shed_id]: drop another shed's statuses (and its running job)."""
+        params = self.router.page.params or {}
+        shed_id = params.get("shed_id")
+        if isinstance(shed_id, list):
+            shed_id = shed_id[0]
+        if str(shed_id or "") != self._shed_id:
+            self._cancel_job()
+            self._reset_statuses(str(shed_id or ""))
+
+    @rx.event(background=True)
+    async def solve_all(self):
+        """Run kinematics for every bike in the shed through a bounded worker queue.
+
+        Each bike's saved geometry is re-read first; a result this shed already
+        holds for the same fingerprint is reused, anything else goes through
+        fetch_kinematics, so an edited bike is solved again.
+        """
+        async with self:
+            if self.solving:
+                return
+            shed = await self.get_state(ShedState)
+            shed_id = str(shed.current_shed.get("id") or "")
+            bike_ids = [str(b["id"]) for b in shed.shed_bikes if b.get("id")]
+            token = (await self.get_state(AuthState)).access_token
+            if not shed_id or not bike_ids or not token:
+                return
+
+            self._job_generation += 1
+            generation = self._job_generation
+            client_token = self.router.session.client_token
+            known = dict(self._results.get(shed_id, {}))
+
+            self._reset_statuses(shed_id)
+            self.bike_status = {bike_id: "queued" for bike_id in bike_ids}
+            self.total_count = len(bike_ids)
+            self.solving = True
+
+        _solve_jobs[client_token] = asyncio.current_task()
+        queue: asyncio.Queue = asyncio.Queue()
+        for bike_id in bike_ids:
+            queue.put_nowait(bike_id)
+
+        async def set_status(bike_id: str, value: str, result: Tuple[str, StepColumns] = None):
+            async with self:
+                if self._job_generation != generation:
+                    raise SolverSuperseded()
+                self.bike_status[bike_id] = value
+                if result is not None:
+                    fingerprint, steps = result
+                    if fingerprint:
+                        self._results.setdefault(shed_id, {})[bike_id] = result
+                    self.bike_summary[bike_id] = _summary(steps)
+                    self.solved_count += 1
+                elif value.startswith("error"):
+                    self.failed_count += 1
+
+        async def worker():
+            while True:
+                try:
+                    bike_id = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                await set_status(bike_id, "solving")
+                try:
+                    fingerprint = await fetch_fingerprint(bike_id, token)
+                except Exception:
+                    fingerprint = None
+                hit = known.get(bike_id)
+                if fingerprint and hit is not None and hit[0] == fingerprint:
+                    await set_status(bike_id, "done", hit)
+                    continue
+                try:
+                    steps, _ = await fetch_kinematics(bike_id, token, fingerprint=fingerprint)
+                except httpx.HTTPStatusError as exc:
+                    await set_status(bike_id, f"error: HTTP {exc.response.status_code}")
+                    continue
+                except Exception as exc:
+                    await set_status(bike_id, f"error: {exc}")
+                    continue
+                await set_status(bike_id, "done", (fingerprint or "", steps))
+
+        workers = [asyncio.create_task(worker()) for _ in range(min(SHED_SOLVE_WORKERS, queue.qsize()))]
+        try:
+            await asyncio.gather(*workers)
+        except (asyncio.CancelledError, SolverSuperseded):
+            pass  # cancelled; cancel_solve_all already reset the state
+        finally:
+            for w in workers:
+                w.cancel()
+            if _solve_jobs.get(client_token) is asyncio.current_task():
+                del _solve_jobs[client_token]
+            async with self:
+                if self._job_generation == generation:
+                    self.solving = False
+                    self._trim_cache(shed_id)
+
+    def _trim_cache(self, keep: str):
+        while len(self._results) > SHED_CACHE_MAX:
+            oldest = next(k for k in self._results if k != keep)
+            del self._results[oldest]
+
+    @rx.event
+    def cancel_solve_all(self):
+        self._cancel_job()
+        self.bike_status = {k: v for k, v in self.bike_status.items() if v == "done" or v.startswith("error")}
+
+    @rx.var
+    def solve_progress(self) -> str:
+        if not self.total_count:
+            return ""
+        finished = self.solved_count + self.failed_count
+        failed = f" ({self.failed_count} failed)" if self.failed_count else ""
+        return f"{finished}/{self.total_count} finished{failed}"
@@ -1,17 +1,18 @@
 # app/state/shed_state.py
 
 from typing import List, Dict, Optional
-import os
-import httpx
+import asyncio
+
 import reflex as rx
 
+from app.backend import get_client, get_json, invalidate_cached, peek_json
+from app.offload import run_offloaded
+from app.search import BikeSearchIndex
 from app.state.auth_state import AuthState
+from app.state.bike_state import fetch_all_bikes, with_hero_urls
 from app.state.page_state import PageState
 
 
-BACKEND_ORIGIN = os.getenv("BACKEND_ORIGIN", "http://127.0.0.1:9000")
-
-
 class ShedState(rx.State):
     """Frontend state for managing bike sheds."""
 
@@ -29,48 +30,75 @@ class ShedState(rx.State):
     # currently viewed shed (for /sheds/[shed_id])
     current_shed: Dict = {}
 
+    async def _access_token(self) -> Optional[str]:
+        """Current access token from AuthState (None if logged out)."""
+        auth_state = await self.get_state(AuthState)
+        return auth_state.access_token or None
+
     async def _auth_headers(self) -> Optional[dict]:
         """Get Authorization headers from AuthState, or redirect to login."""
-        auth_state = await self.get_state(AuthState)
-        token = auth_state.access_token
+        token = await self._access_token()
         if not token:
             return None
         return {"Authorization": f"Bearer {token}"}
 
+    async def _expire_session(self):
+        """Backend said 401: drop the token and redirect to login."""
+        auth_state = await self.get_state(AuthState)
+        return auth_state.expire_session()
+
     # ---------- Load all sheds ----------
 
     async def load_sheds(self):
-        """GET /sheds and store them in state."""
-        self.loading = True
+        """GET /sheds, stale-while-revalidate: last known list first, then refresh."""
         self.message = ""
-        headers = await self._auth_headers()
-        if headers is None:
+        token = await self._access_token()
+        if token is None:
             self.loading = False
-            return rx.redirect("/login")
+            yield rx.redirect("/login")
+            return
 
-        async with httpx.AsyncClient(base_url=BACKEND_ORIGIN) as client:
-            try:
-                r = await client.get("/sheds", headers=headers)
-            except Exception as e:
-                self.loading = False
-                self.message = f"Error contacting backend: {e}"
-                self.sheds = []
-                self.has_sheds = False
-                return
+        stale = peek_json("/sheds", token)
+        if stale is not None:
+            self._set_sheds(stale)
+            self.loading = False
+            yield  # push the cached list before revalidating
+        else:
+            self.loading = True
 
-        self.loading = False
-        if 200 <= r.status_code < 300:
-            data = r.json() or []
+        event = await self._refresh_sheds(token)
+        if event is not None:
+            yield event
+
+    def _set_sheds(self, data: List[Dict]):
+        # Only touch the var when the list changed (no delta otherwise).
+        if self.sheds != data:
             self.sheds = data
-            self.has_sheds = len(data) > 0
+        self.has_sheds = len(data) > 0
+
+    async def _refresh_sheds(self, token: str):
+        """GET /sheds and apply the result; returns a redirect event on 401."""
+        try:
+            status, data = await get_json("/sheds", token)
+        except Exception as e:
+            self.loading = False
+            self.message = f"Error contacting backend: {e}"
+            self.sheds = []
+            self.has_sheds = False
+            return None
+
+        self.loading = False
+        if status == 401:
+            return await self._expire_session()
+
+        if 200 <= status < 300:
+            self._set_sheds(data or [])
         else:
-            try:
-                detail = r.json().get("detail")
-            except Exception:
-                detail = None
-            self.message = detail or f"Failed to load sheds (status {r.status_code})"
+            detail = data.get("detail") if isinstance(data, dict) else None
+            self.message = detail or f"Failed to load sheds (status {status})"
             self.sheds = []
             self.has_sheds = False
+        return None
 
     # ---------- Load a single shed (for /sheds/[shed_id]) ----------
 
@@ -96,16 +124,19 @@ class ShedState(rx.State):
             self.loading = False
             return rx.redirect("/login")
 
-        async with httpx.AsyncClient(base_url=BACKEND_ORIGIN) as client:
-            try:
-                r = await client.get(f"/sheds/{shed_id}", headers=headers)
-            except Exception as e:
-                self.loading = False
-                self.message = f"Error contacting backend: {e}"
-                self.current_shed = {}
-                return
+        client = get_client()
+        try:
+            r = await client.get(f"/sheds/{shed_id}", headers=headers)
+        except Exception as e:
+            self.loading = False
+            self.message = f"Error contacting backend: {e}"
+            self.current_shed = {}
+            return
 
         self.loading = False
+        if r.status_code == 401:
+            return await self._expire_session()
+
         if r.status_code == 200:
             self.current_shed = r.json()
         else:
@@ -129,9 +160,10 @@ class ShedState(rx.State):
         if not self.name.strip():
             self.name = "NEW SHED"
 
-        headers = await self._auth_headers()
-        if headers is None:
+        token = await self._access_token()
+        if token is None:
             return rx.redirect("/login")
+        headers = {"Authorization": f"Bearer {token}"}
 
         payload = {
             "name": self.name.strip(),
@@ -140,17 +172,18 @@ class ShedState(rx.State):
         }
 
         self.loading = True
-        async with httpx.AsyncClient(base_url=BACKEND_ORIGIN) as client:
-            try:
-                r = await client.post("/sheds", json=payload, headers=headers)
-            except Exception as e:
-                self.loading = False
-                self.message = f"Error contacting backend: {e}"
-                return
+        client = get_client()
+        try:
+            r = await client.post("/sheds", json=payload, headers=headers)
+        except Exception as e:
+            self.loading = False
+            self.message = f"Error contacting backend: {e}"
+            return
 
         self.loading = False
 
         if 200 <= r.status_code < 300:
+            invalidate_cached(token, "/sheds")
             data = r.json()
             shed_id = data.get("id")
 
@@ -167,7 +200,9 @@ class ShedState(rx.State):
                 return await self.goto_shed(shed_id)
 
             # Normal (non-redirect) path: behave as before
-            await self.load_sheds()
+            event = await self._refresh_sheds(token)
+            if event is not None:
+                return event
             self.message = "Shed created."
         else:
             try:
@@ -197,18 +232,20 @@ class ShedState(rx.State):
 
         headers = {"Authorization": f"Bearer {token}"}
 
-        async with httpx.AsyncClient(base_url=BACKEND_ORIGIN) as client:
-            try:
-                r = await client.delete(f"/sheds/{shed_id}", headers=headers)
-            except Exception as e:
-                self.loading = False
-                self.message = f"Error contacting backend: {e}"
-                return
+        client = get_client()
+        try:
+            r = await client.delete(f"/sheds/{shed_id}", headers=headers)
+        except Exception as e:
+            self.loading = False
+            self.message = f"Error contacting backend: {e}"
+            return
 
         self.loading = False
         if 200 <= r.status_code < 300:
+            invalidate_cached(token, "/sheds")
             # Remove locally so UI updates instantly
             self.sheds = [s for s in self.sheds if s.get("id") != shed_id]
+            self.has_sheds = len(self.sheds) > 0
             # also clear current_shed if we're on that page
             if self.current_shed.get("id") == shed_id:
                 self.current_shed = {}
@@ -251,12 +288,19 @@ class ShedState(rx.State):
 
     @rx.event
     async def load_shed_detail(self):
-        """Load a single shed, its bikes, and all user bikes for the picker."""
+        """Load a single shed, its bikes, and all user bikes for the picker.
+
+        The three GETs run concurrently; each result is applied (and pushed
+        to the client) as soon as it lands, so the shed header does not wait
+        on the bike lists.
+        """
         self.detail_loading = True
         self.message = ""
         self.current_shed = {}
         self.shed_bikes = []
         self.available_bikes = []   # <-- IMPORTANT: reset here
+        self._search_index = None
+        self.selected_bike_ids = []
 
         # Get shed_id from dynamic route /sheds/[shed_id]
         params = self.router.page.params or {}
@@ -267,72 +311,77 @@ class ShedState(rx.State):
             self.detail_loading = False
             return
 
-        headers = await self._auth_headers()
-        if headers is None:
+        token = await self._access_token()
+        if token is None:
             self.detail_loading = False
-            return rx.redirect("/login")
+            yield rx.redirect("/login")
+            return
+
+        # get_json coalesces these with identical in-flight GETs instead of
+        # firing duplicates (fetch_all_bikes' first page is the same request
+        # as BikeState.load_bikes').
+        tasks = {
+            # 1) the shed itself
+            asyncio.create_task(get_json(f"/sheds/{shed_id}", token)): "shed",
+            # 2) bikes already in this shed
+            asyncio.create_task(
+                get_json(f"/sheds/{shed_id}/bikes", token, postprocess=with_hero_urls)
+            ): "shed_bikes",
+            # 3) ALL bikes for this user (every page) → candidates in the table
+            asyncio.create_task(fetch_all_bikes(token)): "all_bikes",
+        }
+
+        errors: List[str] = []
+        pending = set(tasks)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if not task.cancelled() and task.exception() is None and task.result()[0] == 401:
+                        self.detail_loading = False
+                        yield await self._expire_session()
+                        return
+                    error = self._apply_shed_detail_part(tasks[task], task)
+                    if error:
+                        errors.append(error)
+                    elif tasks[task] == "all_bikes":
+                        # exact + trigram index, built off the event loop
+                        self._search_index = await run_offloaded(BikeSearchIndex, self.available_bikes)
+                self.message = " ".join(errors)
+                if pending:
+                    yield
+        finally:
+            for task in pending:
+                task.cancel()
 
-        async with httpx.AsyncClient(base_url=BACKEND_ORIGIN) as client:
-            # 1) Load the shed itself
-            try:
-                shed_resp = await client.get(f"/sheds/{shed_id}", headers=headers)
-            except Exception as e:
-                self.message = f"Error contacting backend: {e}"
-                self.detail_loading = False
-                return
-
-            if shed_resp.status_code != 200:
-                try:
-                    detail = shed_resp.json().get("detail")
-                except Exception:
-                    detail = None
-                self.message = detail or f"Failed to load shed (status {shed_resp.status_code})"
-                self.detail_loading = False
-                return
-
-            self.current_shed = shed_resp.json()
-
-            # 2) Bikes already in this shed
-            try:
-                bikes_resp = await client.get(f"/sheds/{shed_id}/bikes", headers=headers)
-            except Exception as e:
-                self.message = f"Shed loaded, but failed to load shed bikes: {e}"
-                self.detail_loading = False
-                return
-
-            if bikes_resp.status_code == 200:
-                # Trust backend's BikeOut hero_url (same as /bikes)
-                self.shed_bikes = bikes_resp.json() or []
-            else:
-                try:
-                    detail = bikes_resp.json().get("detail")
-                except Exception:
-                    detail = None
-                self.message = detail or f"Failed to load shed bikes (status {bikes_resp.status_code})"
-                self.shed_bikes = []
-                self.selected_bike_ids = []
-
-            # 3) ALL bikes for this user → used as candidates in the table
-            try:
-                all_bikes_resp = await client.get("/bikes", headers=headers)
-            except Exception as e:
-                self.message = f"Shed loaded, but failed to load bikes list: {e}"
-                self.available_bikes = []
-                self.detail_loading = False
-                return
-
-            if all_bikes_resp.status_code == 200:
-                self.available_bikes = all_bikes_resp.json() or []
-            else:
-                try:
-                    detail = all_bikes_resp.json().get("detail")
-                except Exception:
-                    detail = None
-                self.message = detail or f"Failed to load bikes list (status {all_bikes_resp.status_code})"
-                self.available_bikes = []
-        self.selected_bike_ids = [b["id"] for b in self.shed_bikes]
         self.detail_loading = False
 
+    def _apply_shed_detail_part(self, part: str, task: asyncio.Task) -> Optional[str]:
+        """Store one finished load_shed_detail response; return an error message or None."""
+        try:
+            status, data = task.result()
+        except Exception as e:
+            if part == "shed":
+                return f"Error contacting backend: {e}"
+            if part == "shed_bikes":
+                return f"Failed to load shed bikes: {e}"
+            return f"Failed to load bikes list: {e}"
+
+        if status != 200:
+            detail = data.get("detail") if isinstance(data, dict) else None
+            labels = {"shed": "shed", "shed_bikes": "shed bikes", "all_bikes": "bikes list"}
+            return detail or f"Failed to load {labels[part]} (status {status})"
+
+        if part == "shed":
+            self.current_shed = data
+        elif part == "shed_bikes":
+            # Same BikeOut shape as /bikes (hero_url / hero_thumb_url filled in)
+            self.shed_bikes = data or []
+            self.selected_bike_ids = [b["id"] for b in self.shed_bikes]
+        else:
+            self.available_bikes = data or []
+        return None
+
     @rx.event
     async def goto_shed(self, shed_id: str):
         """Navigate to the shed detail page for this shed, with loader."""
@@ -367,6 +416,9 @@ class ShedState(rx.State):
 
     # Bikes we can add to this shed (e.g. all user's bikes)
     available_bikes: List[Dict] = []
+    # normalized fields + token maps over available_bikes (app.search),
+    # built once per load instead of per keystroke
+    _search_index: Optional[BikeSearchIndex] = None
 
     # which bikes are selected in the picker (by id)
     selected_bike_ids: List[str] = []
@@ -410,23 +462,23 @@ class ShedState(rx.State):
 
         is_selected = bike_id in self.selected_bike_ids
 
-        async with httpx.AsyncClient(base_url=BACKEND_ORIGIN) as client:
-            try:
-                if is_selected:
-                    # Remove from shed
-                    resp = await client.delete(
-                        f"/sheds/{shed_id}/bikes/{bike_id}",
-                        headers=headers,
-                    )
-                else:
-                    # Add to shed
-                    resp = await client.post(
-                        f"/sheds/{shed_id}/bikes/{bike_id}",
-                        headers=headers,
-                    )
-            except Exception as e:
-                self.message = f"Failed to update shed bikes: {e}"
-                return
+        client = get_client()
+        try:
+            if is_selected:
+                # Remove from shed
+                resp = await client.delete(
+                    f"/sheds/{shed_id}/bikes/{bike_id}",
+                    headers=headers,
+                )
+            else:
+                # Add to shed
+                resp = await client.post(
+                    f"/sheds/{shed_id}/bikes/{bike_id}",
+                    headers=headers,
+                )
+        except Exception as e:
+            self.message = f"Failed to update shed bikes: {e}"
+            return
 
         if not (200 <= resp.status_code < 300):
             try:
@@ -456,26 +508,17 @@ class ShedState(rx.State):
 
     @rx.var
     def filtered_bikes(self) -> List[Dict]:
-        """Apply simple filters to available_bikes for the picker table."""
+        """Apply the picker filters to available_bikes via the search index.
+
+        Free text also pulls in near misses (typos, missing spaces) after
+        the exact matches.
+        """
         bikes = self.available_bikes or []
-        bf = (self.brand_filter or "").lower()
-        mf = (self.model_filter or "").lower()
-        yf = (self.year_filter or "").strip()
-        tf = (self.text_filter or "").lower()
-
-        out = []
-        for b in bikes:
-            brand = str(b.get("brand", "") or "").lower()
-            name  = str(b.get("name", "") or "").lower()
-            year  = str(b.get("model_year", "") or "")
-
-            if bf and bf not in brand:
-                continue
-            if mf and mf not in name:
-                continue
-            if yf and yf != year:
-                continue
-            if tf and tf not in (brand + " " + name + " " + year).lower():
-                continue
-            out.append(b)
-        return out
\ No newline at end of file
+        index = self._search_index
+        if index is None or index.size != len(bikes):
+            # list changed outside a load: exact matching only, no trigram build here
+            index = BikeSearchIndex(bikes, fuzzy=False)
+        query = BikeSearchIndex.query(
+            self.brand_filter, self.model_filter, self.year_filter, self.text_filter
+        )
+        return index.filter(bikes, query, fuzzy_text=self.text_filter)
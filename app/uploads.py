@@ -0,0 +1,173 @@
+# app/uploads.py
+"""Temporary server-side store for files the user picked but hasn't saved yet.
+
+Instead of holding the hero image as base64 in Reflex state (and shipping it
+over the websocket in every delta), uploads are spooled to disk and state only
+keeps an opaque handle. The preview is served from a short-lived URL and
+save_bike streams the bytes from the spool to the backend.
+
+Metadata lives in a sidecar JSON file next to each blob, so any worker on the
+same host can serve a handle. Entries expire after UPLOAD_SPOOL_TTL seconds.
+
+Tunable via env:
+  UPLOAD_SPOOL_DIR       where spooled files live
+  UPLOAD_SPOOL_TTL       seconds before an unsaved upload is evicted
+  UPLOAD_MAX_BYTES       largest accepted hero image
+"""
+import asyncio
+import contextlib
+import dataclasses
+import json
+import os
+import re
+import secrets
+import tempfile
+import time
+from pathlib import Path
+from typing import BinaryIO, Optional
+
+from reflex.config import get_config
+from starlette.requests import Request
+from starlette.responses import FileResponse, Response
+from starlette.routing import Route
+
+from app.offload import run_offloaded
+
+SPOOL_DIR = Path(os.getenv("UPLOAD_SPOOL_DIR", os.path.join(tempfile.gettempdir(), "trigpoint-uploads")))
+UPLOAD_TTL = float(os.getenv("UPLOAD_SPOOL_TTL", "900"))
+MAX_UPLOAD_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", "20000000"))
+
+SPOOL_ROUTE = "/_spool"
+_HANDLE_RE = re.compile(r"^[A-Za-z0-9_-]{32}$")
+_CHUNK = 1024 * 1024
+
+
+class UploadTooLarge(ValueError):
+    pass
+
+
+@dataclasses.dataclass
+class SpooledFile:
+    handle: str
+    path: Path
+    filename: str
+    content_type: str
+    size: int
+
+
+def _paths(handle: str) -> tuple[Path, Path]:
+    return SPOOL_DIR / handle, SPOOL_DIR / f"{handle}.json"
+
+
+def _copy_limited(src: BinaryIO, dst_path: Path, limit: int) -> int:
+    size = 0
+    with open(dst_path, "wb") as dst:
+        while True:
+            chunk = src.read(_CHUNK)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > limit:
+                raise UploadTooLarge(f"max {limit // 1_000_000}MB")
+            dst.write(chunk)
+    return size
+
+
+def _write_spool(src: BinaryIO, handle: str, filename: str, content_type: str) -> SpooledFile:
+    SPOOL_DIR.mkdir(parents=True, exist_ok=True)
+    blob, meta = _paths(handle)
+    try:
+        size = _copy_limited(src, blob, MAX_UPLOAD_BYTES)
+    except BaseException:
+        blob.unlink(missing_ok=True)
+        raise
+    meta.write_text(json.dumps({"filename": filename, "content_type": content_type, "size": size}))
+    return SpooledFile(handle, blob, filename, content_type, size)
+
+
+async def spool_upload(upload) -> SpooledFile:
+    """Copy an rx.UploadFile into the spool (off the event loop).
+
+    Raises UploadTooLarge past UPLOAD_MAX_BYTES.
+    """
+    handle = secrets.token_urlsafe(24)
+    filename = upload.filename or "image"
+    content_type = upload.content_type or "application/octet-stream"
+    await upload.seek(0)
+    return await run_offloaded(_write_spool, upload.file, handle, filename, content_type)
+
+
+def get_spooled(handle: str) -> Optional[SpooledFile]:
+    """Look up a live spooled file; None if unknown, malformed or expired."""
+    if not handle or not _HANDLE_RE.match(handle):
+        return None
+    blob, meta = _paths(handle)
+    try:
+        if blob.stat().st_mtime + UPLOAD_TTL < time.time():
+            discard(handle)
+            return None
+        info = json.loads(meta.read_text())
+    except (OSError, ValueError):
+        return None
+    return SpooledFile(handle, blob, info["filename"], info["content_type"], info["size"])
+
+
+def discard(handle: str):
+    if handle and _HANDLE_RE.match(handle):
+        for p in _paths(handle):
+            p.unlink(missing_ok=True)
+
+
+def preview_url(handle: str) -> str:
+    """Absolute URL the browser can load the spooled image from."""
+    return f"{get_config().api_url}{SPOOL_ROUTE}/{handle}"
+
+
+def sweep_expired():
+    """Delete spooled files older than UPLOAD_TTL."""
+    if not SPOOL_DIR.is_dir():
+        return
+    cutoff = time.time() - UPLOAD_TTL
+    for p in SPOOL_DIR.iterdir():
+        with contextlib.suppress(OSError):
+            if p.stat().st_mtime < cutoff:
+                p.unlink()
+
+
+# ---------- HTTP route ----------
+
+async def serve_spooled(request: Request) -> Response:
+    spooled = get_spooled(request.path_params["handle"])
+    if spooled is None:
+        return Response(status_code=404)
+    # Only ever hand user-supplied bytes back as an image (or opaque blob).
+    media_type = spooled.content_type
+    if not media_type.startswith("image/") or "svg" in media_type:
+        media_type = "application/octet-stream"
+    return FileResponse(
+        spooled.path,
+        media_type=media_type,
+        headers={
+            "Cache-Control": f"private, max-age={int(UPLOAD_TTL)}",
+            "X-Content-Type-Options": "nosniff",
+        },
+    )
+
+
+routes = [Route(SPOOL_ROUTE + "/{handle}", serve_spooled, methods=["GET", "HEAD"])]
+
+
+@contextlib.asynccontextmanager
+async def uploads_lifespan():
+    """Reflex lifespan task: evict expired uploads every minute."""
+
+    async def sweeper():
+        while True:
+            await run_offloaded(sweep_expired)
+            await asyncio.sleep(60)
+
+    task = asyncio.create_task(sweeper())
+    try:
+        yield
+    finally:
+        task.cancel()
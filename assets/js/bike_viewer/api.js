@@ -21,6 +21,13 @@ BV.getAuthHeaders = function (accessToken) {
     return h;
 };
 
+// The kinematics panel keeps a hidden button that re-checks its result
+// against the saved geometry; press it after every successful save.
+BV.afterSave = function (res) {
+    if (res && res.ok) document.getElementById("kinematics-geometry-check")?.click();
+    return res;
+};
+
 BV.fetchBike = async function ({ container, bikeId, accessToken }) {
     const API_BASE = BV.getApiBase(container);
     if (!API_BASE) throw new Error("BACKEND_ORIGIN missing");
@@ -58,7 +65,7 @@ BV.putPoints = async function ({ container, bikeId, accessToken, pointsPayload }
         headers: BV.getAuthHeaders(accessToken),
         credentials: "include",
         body: JSON.stringify(pointsPayload),
-    });
+    }).then(BV.afterSave);
 };
 
 BV.putBodies = async function ({ container, bikeId, accessToken, payload }) {
@@ -70,7 +77,7 @@ BV.putBodies = async function ({ container, bikeId, accessToken, payload }) {
         headers: BV.getAuthHeaders(accessToken),
         credentials: "include",
         body: JSON.stringify(payload),
-    });
+    }).then(BV.afterSave);
 };
 
 BV.putGeometry = async function ({ container, bikeId, accessToken, payload }) {
@@ -82,7 +89,7 @@ BV.putGeometry = async function ({ container, bikeId, accessToken, payload }) {
         headers: BV.getAuthHeaders(accessToken),
         credentials: "include",
         body: JSON.stringify(payload),
-    });
+    }).then(BV.afterSave);
 };
 
 console.log("[BikeViewer] api.js loaded");
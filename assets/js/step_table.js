@@ -0,0 +1,125 @@
+// /js/step_table.js
+//
+// Virtualized solver-step table.
+//
+// Reflex renders ONE empty scroll box per table (data-step-table) and puts
+// the rows in data-rows as compact JSON: one array of cell values per step.
+// Only the rows inside the viewport (+ overscan) exist in the DOM, so the
+// component count stays constant no matter how many steps the solver returns.
+//
+// While the solver streams, data-append carries just the latest batch
+// ({"base": rows before it, "rows": [...]}) and is appended here; once it
+// is cleared, data-rows (the full result) takes over.
+(() => {
+    const ROW_HEIGHT = 24; // px, keep in sync with .step-table-row in theme.css
+    const OVERSCAN = 10;
+    const tables = new WeakMap();
+
+    function fmt(v) {
+        if (typeof v !== "number") return v == null ? "" : String(v);
+        return Number.isInteger(v) ? String(v) : String(Number(v.toFixed(Math.abs(v) < 1 ? 4 : 3)));
+    }
+
+    function render(el, st) {
+        const n = st.rows.length;
+        const first = Math.max(0, Math.floor(el.scrollTop / ROW_HEIGHT) - OVERSCAN);
+        const last = Math.min(n, Math.ceil((el.scrollTop + el.clientHeight) / ROW_HEIGHT) + OVERSCAN);
+        if (first === st.first && last === st.last) return;
+        st.first = first;
+        st.last = last;
+
+        const frag = document.createDocumentFragment();
+        for (let i = first; i < last; i++) {
+            const row = document.createElement("div");
+            row.className = "step-table-row";
+            row.style.top = `${i * ROW_HEIGHT}px`;
+            for (const v of st.rows[i]) {
+                const cell = document.createElement("span");
+                cell.textContent = fmt(v);
+                row.appendChild(cell);
+            }
+            frag.appendChild(row);
+        }
+        st.body.replaceChildren(frag);
+    }
+
+    function mount(el) {
+        let st = tables.get(el);
+        if (!st) {
+            const body = document.createElement("div");
+            body.style.position = "relative";
+            el.appendChild(body);
+            st = { body, raw: null, appendRaw: "", rows: [], first: -1, last: -1, frame: 0 };
+            el.addEventListener(
+                "scroll",
+                () => {
+                    if (st.frame) return;
+                    st.frame = requestAnimationFrame(() => {
+                        st.frame = 0;
+                        render(el, st);
+                    });
+                },
+                { passive: true },
+            );
+            tables.set(el, st);
+        }
+
+        const tail = el.dataset.append || "";
+        if (tail) {
+            if (tail === st.appendRaw) return;
+            st.appendRaw = tail;
+            st.raw = null; // re-read data-rows when the stream ends
+            let batch;
+            try {
+                batch = JSON.parse(tail);
+            } catch (e) {
+                console.warn("[StepTable] bad data-append", e);
+                return;
+            }
+            if (batch.base === 0) st.rows = batch.rows.slice();
+            else if (batch.base === st.rows.length) st.rows.push(...batch.rows);
+            else return; // out of order; the final data-rows will fix it
+        } else {
+            st.appendRaw = "";
+            const raw = el.dataset.rows || "[]";
+            if (raw === st.raw) return;
+            st.raw = raw;
+            try {
+                st.rows = JSON.parse(raw);
+            } catch (e) {
+                console.warn("[StepTable] bad data-rows", e);
+                st.rows = [];
+            }
+        }
+        st.body.style.height = `${st.rows.length * ROW_HEIGHT}px`;
+        st.first = st.last = -1;
+        render(el, st);
+    }
+
+    function scan() {
+        document.querySelectorAll("[data-step-table]").forEach(mount);
+    }
+
+    let pending = 0;
+    function scheduleScan() {
+        if (pending) return;
+        pending = requestAnimationFrame(() => {
+            pending = 0;
+            scan();
+        });
+    }
+
+    if (document.readyState === "loading") {
+        document.addEventListener("DOMContentLoaded", scan, { once: true });
+    } else {
+        scan();
+    }
+
+    // Tables appear on SPA navigation; data-rows / data-append change per solver run.
+    new MutationObserver(scheduleScan).observe(document.documentElement, {
+        childList: true,
+        subtree: true,
+        attributes: true,
+        attributeFilter: ["data-rows", "data-append"],
+    });
+})();